@@ -0,0 +1,24 @@
+"""
+Settings profiles for app project.
+
+DJANGO_ENV selects the profile: "dev" (default), "test" or "prod". Each
+profile extends app.settings.base and only the selected one is imported,
+so debug-only apps are never loaded outside of dev.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'dev':
+    from app.settings.dev import *  # noqa: F401,F403
+elif DJANGO_ENV == 'test':
+    from app.settings.test import *  # noqa: F401,F403
+elif DJANGO_ENV == 'prod':
+    from app.settings.prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Unknown DJANGO_ENV "{DJANGO_ENV}", expected dev, test or prod.'
+    )
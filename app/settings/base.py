@@ -0,0 +1,384 @@
+"""
+Django settings for app project shared by every profile.
+
+Generated by 'django-admin startproject' using Django 4.1.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/4.1/ref/settings/
+"""
+
+import importlib.util
+import os
+import tempfile
+from pathlib import Path
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "django-insecure-s&_xc)p6dq0mm381cyk!o%j1%tibg=@zd2hqec-zecxthyt&fg"
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver', '127.0.0.1']
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "core",
+    "rest_framework",
+    "rest_framework.authtoken",
+    "drf_spectacular",
+    "user",
+    "recipe"
+]
+
+MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
+    "core.querywatch.QueryWatchMiddleware",
+    "core.compression.CompressionMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.profiling.ProfilingMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "app.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "app.wsgi.application"
+
+# Database
+# https://docs.djangoproject.com/en/4.1/ref/settings/#databases
+
+# To start PGSQL server: pg_ctl -D /home/oem/Projects/db/recipes start
+#
+# Connection handling is driven by the environment:
+#   DB_CONN_MAX_AGE        seconds a connection is kept open between requests
+#                          (0 closes it after every request, "none" keeps it
+#                          open forever).
+#   DB_CONN_HEALTH_CHECKS  ping persistent connections before reusing them.
+#   DB_POOL                use the backend's built-in connection pool
+#                          (Django >= 5.1 with psycopg 3; startup fails with
+#                          ImproperlyConfigured otherwise). The pool replaces
+#                          persistent connections, so CONN_MAX_AGE is forced
+#                          to 0 when it is enabled.
+#   DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT  pool sizing.
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default=None):
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    if value.strip().lower() == 'none':
+        return None
+    return int(value)
+
+
+def env_rate(name, default):
+    value = os.environ.get(name, default)
+    if value.strip().lower() == 'none':
+        return None
+    return value
+
+
+DB_CONN_MAX_AGE = env_int('DB_CONN_MAX_AGE', 60)
+DB_POOL = env_bool('DB_POOL')
+if DB_POOL:
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured(
+            'DB_POOL requires Django 5.1 or later; this is Django '
+            f'{django.get_version()}.'
+        )
+    if importlib.util.find_spec('psycopg') is None:
+        raise ImproperlyConfigured(
+            'DB_POOL requires psycopg 3 (psycopg2 has no built-in pool).'
+        )
+
+DATABASES = {
+    "default": {
+        "ENGINE": os.environ.get('DB_ENGINE', "django.db.backends.postgresql"),
+        'NAME': os.environ.get('DB_NAME', 'recipes'),
+        'USER': os.environ.get('DB_USER', 'dzale'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'prasence123'),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {},
+        'TEST': {
+            'NAME': os.environ.get('DB_TEST_NAME', 'recipes_test')
+        }
+    },
+    "sqlite3": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+}
+
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env_int('DB_POOL_MIN_SIZE', 2),
+        'max_size': env_int('DB_POOL_MAX_SIZE', 10),
+        'timeout': env_int('DB_POOL_TIMEOUT', 10),
+    }
+
+# Read replicas: DB_REPLICA_HOSTS is a comma separated list of hosts that
+# mirror the default database. Safe-method requests read from a random
+# replica; writes, and reads by a client that wrote within the last
+# DB_REPLICA_STICKY_SECONDS, go to "default".
+REPLICA_DATABASES = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+REPLICA_STICKY_SECONDS = env_int('DB_REPLICA_STICKY_SECONDS', 5)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+#
+# The default per-process cache is fine for a single worker. Point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis) when running
+# several workers so that state such as replica stickiness is shared.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Password validation
+# https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+# Internationalization
+# https://docs.djangoproject.com/en/4.1/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/4.1/howto/static-files/
+
+STATIC_URL = 'static/static/'
+MEDIA_URL = 'static/media/'
+
+STATIC_ROOT = '/vol/web/static'
+MEDIA_ROOT = '/vol/web/media'
+
+# Media storage (see core/storage.py): "local" keeps files under MEDIA_ROOT
+# behind signed URLs, "s3" uses an S3-compatible object store and needs
+# django-storages and boto3. Clients upload and download through presigned
+# URLs valid for the given number of seconds.
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'local')
+DEFAULT_FILE_STORAGE = {
+    'local': 'core.storage.LocalMediaStorage',
+    's3': 'core.storage.S3MediaStorage',
+}[MEDIA_STORAGE]
+MEDIA_URL_EXPIRE = env_int('MEDIA_URL_EXPIRE', 3600)
+MEDIA_UPLOAD_EXPIRE = env_int('MEDIA_UPLOAD_EXPIRE', 600)
+MEDIA_UPLOAD_MAX_SIZE = env_int('MEDIA_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+
+# How protected local media is handed to the front-end server (see
+# core/media.py): "nginx" (X-Accel-Redirect), "apache" (X-Sendfile), or
+# empty to stream files from Django.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/'
+)
+
+# Resized recipe image variants (see core/images.py), cached on local disk
+# under MEDIA_ROOT. Sizes are the bounding boxes clients may request.
+IMAGE_VARIANT_DIR = 'variants'
+IMAGE_VARIANT_SIZES = os.environ.get(
+    'IMAGE_VARIANT_SIZES', '160x160,320x320,640x640,1280x1280'
+).split(',')
+IMAGE_VARIANT_CACHE_SIZE = env_int(
+    'IMAGE_VARIANT_CACHE_SIZE', 512 * 1024 * 1024
+)
+IMAGE_VARIANT_QUALITY = env_int('IMAGE_VARIANT_QUALITY', 80)
+
+AWS_STORAGE_BUCKET_NAME = os.environ.get('S3_BUCKET')
+AWS_S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+AWS_S3_REGION_NAME = os.environ.get('S3_REGION')
+AWS_S3_FILE_OVERWRITE = False
+AWS_DEFAULT_ACL = None
+AWS_QUERYSTRING_EXPIRE = MEDIA_URL_EXPIRE
+# Default primary key field type
+# https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = dict(
+    DEFAULT_SCHEMA_CLASS='drf_spectacular.openapi.AutoSchema',
+    DEFAULT_THROTTLE_CLASSES=[
+        'core.throttling.IPTokenBucketThrottle',
+        'core.throttling.UserTokenBucketThrottle',
+        'core.throttling.ScopedTokenBucketThrottle',
+    ],
+    # Per process with the local store (see core/throttling.py). "none"
+    # disables a rate.
+    DEFAULT_THROTTLE_RATES={
+        'ip': env_rate('THROTTLE_RATE_IP', '1200/min'),
+        'user': env_rate('THROTTLE_RATE_USER', '600/min'),
+        'token': env_rate('THROTTLE_RATE_TOKEN', '20/min'),
+        'account': env_rate('THROTTLE_RATE_ACCOUNT', '60/min'),
+        'recipes': env_rate('THROTTLE_RATE_RECIPES', '300/min'),
+        'sync': env_rate('THROTTLE_RATE_SYNC', '60/min'),
+    },
+    # Reverse proxies in front of the app. Throttles key anonymous clients
+    # by the address this many hops from the end of X-Forwarded-For, or by
+    # REMOTE_ADDR when 0; DRF's default (None) trusts the whole header,
+    # which any client can set to get a fresh bucket.
+    NUM_PROXIES=env_int('NUM_PROXIES', 0),
+)
+
+THROTTLE_ENABLED = env_bool('THROTTLE_ENABLED', True)
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'local')
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'default')
+
+SPECTACULAR_SETTINGS = {
+    'COMPONENT_SPLIT_REQUEST': True,
+}
+
+# /metrics/ (core.views.metrics) answers requests with "Authorization:
+# Bearer <METRICS_TOKEN>", staff sessions and clients from these addresses
+# or networks; everyone else gets a 403. None are allowed by default. The
+# check uses REMOTE_ADDR, so never list the address of a reverse proxy in
+# front of the app: everything it forwards would be allowed.
+METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.environ.get('METRICS_ALLOWED_IPS', '').split(',')
+    if address.strip()
+]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Admin changelists with more rows than this (by the PostgreSQL planner's
+# estimate) show the estimate instead of running COUNT(*).
+ADMIN_EXACT_COUNT_LIMIT = env_int('ADMIN_EXACT_COUNT_LIMIT', 10000)
+
+# Response compression (see core/compression.py) and the per-user cache of
+# list responses, stored precompressed (see core/cache.py).
+COMPRESSION_MIN_SIZE = env_int('COMPRESSION_MIN_SIZE', 1024)
+RESPONSE_CACHE_TIMEOUT = env_int('RESPONSE_CACHE_TIMEOUT', 300)
+
+# Idempotency-Key handling (see core/idempotency.py): how long responses
+# are replayed to retries, and how long a request may hold its key before
+# another one may claim it. Needs a cache shared by all workers.
+IDEMPOTENCY_KEY_TIMEOUT = env_int('IDEMPOTENCY_KEY_TIMEOUT', 24 * 60 * 60)
+IDEMPOTENCY_LOCK_TIMEOUT = env_int('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+# Background jobs (see core/jobs.py), run by `manage.py run_jobs`. With
+# JOBS_EAGER they run inside the request that queues them instead.
+JOBS_EAGER = env_bool('JOBS_EAGER', False)
+JOBS_CONCURRENCY = env_int('JOBS_CONCURRENCY', 4)
+JOBS_LOCK_TIMEOUT = env_int('JOBS_LOCK_TIMEOUT', 10 * 60)
+JOBS_RETRY_BACKOFF = env_int('JOBS_RETRY_BACKOFF', 10)
+JOBS_RETRY_BACKOFF_MAX = env_int('JOBS_RETRY_BACKOFF_MAX', 60 * 60)
+JOBS_KEEP_SUCCEEDED = env_int('JOBS_KEEP_SUCCEEDED', 24 * 60 * 60)
+
+# Most change log entries a single GET /api/sync/ response covers; clients
+# keep calling with the returned token while "has_more" is true.
+SYNC_MAX_CHANGES = env_int('SYNC_MAX_CHANGES', 1000)
+# Sync tokens do not move past change log entries younger than this, in
+# case an entry with a lower id is still committing (see core.models).
+SYNC_SETTLE_SECONDS = env_int('SYNC_SETTLE_SECONDS', 2)
+
+# Most recipes one GET /api/recipes/batch/?ids=... request can ask for.
+RECIPE_BATCH_MAX_IDS = env_int('RECIPE_BATCH_MAX_IDS', 50)
+
+# Directory written by `manage.py build_schema` at deploy time. When unset,
+# the schema is generated on first request and kept in memory.
+SCHEMA_ROOT = os.environ.get('SCHEMA_ROOT')
+SCHEMA_PRECOMPRESS = env_bool('SCHEMA_PRECOMPRESS', True)
+
+# Query inspection (see core/querywatch.py). Turn QUERY_WATCH on in staging
+# to log N+1 patterns and slow queries per request; QUERY_WATCH_EXPLAIN also
+# EXPLAINs every distinct SELECT to find sequential scans.
+QUERY_WATCH = env_bool('QUERY_WATCH')
+QUERY_WATCH_REPEAT_THRESHOLD = env_int('QUERY_WATCH_REPEAT_THRESHOLD', 5)
+QUERY_WATCH_SLOW_MS = env_int('QUERY_WATCH_SLOW_MS', 100)
+QUERY_WATCH_EXPLAIN = env_bool('QUERY_WATCH_EXPLAIN')
+
+# On-demand request profiling (see core/profiling.py).
+PROFILE_ROOT = os.environ.get(
+    'PROFILE_ROOT',
+    os.path.join(tempfile.gettempdir(), 'recipe-app-profiles')
+)
+PROFILE_MAX_KEPT = env_int('PROFILE_MAX_KEPT', 100)
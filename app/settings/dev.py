@@ -0,0 +1,16 @@
+"""
+Development settings: debug mode and debugging helpers.
+"""
+
+from app.settings.base import *  # noqa: F401,F403
+from app.settings.base import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+DEBUG = True
+
+INSTALLED_APPS = ["django_extensions"] + INSTALLED_APPS + ["django_dump_die"]
+
+MIDDLEWARE = MIDDLEWARE + ['django_dump_die.middleware.DumpAndDieMiddleware']
+
+TEMPLATES[0]["OPTIONS"]["context_processors"].insert(
+    0, "django.template.context_processors.debug"
+)
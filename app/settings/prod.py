@@ -0,0 +1,57 @@
+"""
+Production settings.
+
+See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
+"""
+
+import os
+
+from app.settings.base import *  # noqa: F401,F403
+from app.settings.base import QUERY_WATCH, TEMPLATES, env_bool
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+
+# Compile templates once per process instead of on every render.
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+
+# Only the layers production needs. The admin needs sessions, CSRF, auth
+# and messages. The diagnostic middlewares are off by default: query
+# watching follows QUERY_WATCH and on-demand profiling needs PROFILING=1.
+MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
+    "core.compression.CompressionMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+if QUERY_WATCH:
+    MIDDLEWARE.insert(1, "core.querywatch.QueryWatchMiddleware")
+if env_bool('PROFILING'):
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index(
+            "django.contrib.auth.middleware.AuthenticationMiddleware"
+        ) + 1,
+        "core.profiling.ProfilingMiddleware",
+    )
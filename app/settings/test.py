@@ -0,0 +1,35 @@
+"""
+Test settings: no debug mode, so queries are not kept in memory and
+debug-only apps are not loaded.
+
+Tests run against in-memory SQLite so no database server is needed and
+`manage.py test --parallel` can clone the database per worker. Set
+TEST_DB=env to run against the database configured by the DB_* variables
+(e.g. Postgres) instead.
+"""
+import os
+
+from app.settings.base import *  # noqa: F401,F403
+from app.settings.base import DATABASES, REPLICA_DATABASES
+
+DEBUG = False
+
+if os.environ.get('TEST_DB', 'sqlite') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+    for alias in REPLICA_DATABASES:
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# Hashing with the production hasher dominates tests that create users.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+QUERY_WATCH = True
+
+TEST_RUNNER = 'app.test_runner.TestRunner'
+
+THROTTLE_ENABLED = False
@@ -0,0 +1,25 @@
+"""
+Test runner for the project.
+"""
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+from django.test.utils import iter_test_cases
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Clears every cache after each test. Rolled back test transactions
+    hand out the same ids again, so a test could otherwise be served
+    entries cached for another test's user or recipe.
+    """
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        for test in iter_test_cases(suite):
+            test.addCleanup(clear_caches)
+        return suite
@@ -15,17 +15,31 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
-from django.conf import settings
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView
-)
+from core import views as core_views
+from core.schema import CachedSchemaView
+from recipe.views import RecipeImageVariantView
+from drf_spectacular.views import SpectacularSwaggerView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('metrics/', core_views.metrics, name='metrics'),
+    path(
+        'storage/<path:name>',
+        core_views.LocalStorageView.as_view(),
+        name='local-storage'
+    ),
+    path(
+        'api/profiles/<str:profile_id>/',
+        core_views.ProfileView.as_view(),
+        name='profile-detail'
+    ),
+    path(
+        'media/recipe/<int:pk>/<int:width>x<int:height>.<str:fmt>',
+        RecipeImageVariantView.as_view(),
+        name='recipe-image-variant'
+    ),
+    path('api/schema/', CachedSchemaView.as_view(), name='api-schema'),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
@@ -34,9 +48,3 @@ urlpatterns = [
     path('api/', include('user.urls')),
     path('api/', include('recipe.urls'))
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
@@ -0,0 +1,624 @@
+"""
+Run the API benchmarks and compare them to a stored baseline.
+
+In-process (default): creates a throwaway database through Django's test
+database machinery (SQLite or the local Postgres configured by the DB_*
+variables), seeds it and drives the full middleware/DRF stack with the
+Django test client:
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale small --save-baseline
+
+Against a running server (gunicorn, uvicorn, ...) with concurrent clients,
+after seeding its database with the same scale:
+
+    python manage.py seed --users 4 --recipes 25
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 --concurrency 16
+
+To compare servers, e.g. WSGI against ASGI, pass the server's pid: the
+peak resident memory of it and its worker processes during each workload
+is reported (Linux, read from /proc). --slow-clients keeps that many extra
+connections sending their request one byte at a time while the workloads
+run, which ties up a worker each on a sync WSGI server but not on ASGI:
+
+    gunicorn app.wsgi --workers 4 & SERVER=$!
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 \\
+        --concurrency 16 --server-pid $SERVER --slow-clients 8 --json wsgi.json
+    kill $SERVER
+    uvicorn app.asgi:application --workers 4 & SERVER=$!
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 \\
+        --concurrency 16 --server-pid $SERVER --slow-clients 8 --json asgi.json
+
+On PostgreSQL every workload also reports the peak number of connections
+to the database, sampled from pg_stat_activity, for comparing connection
+handling modes. Run the benchmark with the server's DB_* variables, so it
+watches the same database and records the mode (DB_CONN_MAX_AGE,
+DB_POOL) in its results. Baselines are only compared within one mode:
+
+    DB_CONN_MAX_AGE=0 gunicorn app.wsgi --workers 4 --threads 4 &
+    DB_CONN_MAX_AGE=0 python -m benchmarks.run --base-url ... \\
+        --concurrency 16 --json per-request.json
+    # again with DB_CONN_MAX_AGE=60 (the default), and with DB_POOL=1
+
+In-process runs use the settings profile given by --profile (default:
+prod), so the per-request overhead of dev and prod compares run against
+run.
+--startup N also times N fresh interpreters loading the WSGI application
+(settings, apps, URLconf, middleware) with that profile:
+
+    python -m benchmarks.run --profile dev --startup 5 --json dev.json
+    python -m benchmarks.run --profile prod --startup 5 --json prod.json
+
+Before timing, every session fetches each of its recipes once so the
+detail cache is warm. Each workload then runs --repeat times, interleaved
+with the other workloads so drift hits them all alike, and reports the
+median throughput and p50/p95/p99 latency of those runs. When a baseline
+recorded with the same settings (scale, transport, database, profile,
+connection handling, ...) exists, a median p95 latency or throughput
+more than --tolerance worse than the baseline fails the run.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+SCALES = {
+    'small': {'users': 4, 'recipes': 25},
+    'medium': {'users': 10, 'recipes': 200},
+    'large': {'users': 50, 'recipes': 1000},
+}
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+# Metrics only some runs have: (result key, column title).
+OPTIONAL_COLUMNS = [
+    ('peak_rss_mb', 'RSS MB'),
+    ('peak_db_connections', 'DB conns'),
+]
+PASSWORD = 'benchmark'
+
+
+class InProcessTransport:
+    name = 'in-process'
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client()
+
+    def request(self, method, path, headers=None, json=None, files=None):
+        extra = {
+            'HTTP_' + key.upper().replace('-', '_'): value
+            for key, value in (headers or {}).items()
+        }
+        if files is not None:
+            response = self.client.post(path, files, **extra)
+        elif json is not None:
+            response = self.client.generic(
+                method, path, _dumps(json),
+                content_type='application/json', **extra
+            )
+        else:
+            response = self.client.generic(method, path, **extra)
+        return response.status_code, response.content
+
+
+class HttpTransport:
+    name = 'http'
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.local = threading.local()
+
+    def connection(self):
+        if not hasattr(self.local, 'connection'):
+            cls = (
+                http.client.HTTPSConnection if self.scheme == 'https'
+                else http.client.HTTPConnection
+            )
+            self.local.connection = cls(self.netloc, timeout=60)
+        return self.local.connection
+
+    def request(self, method, path, headers=None, json=None, files=None):
+        from django.test.client import BOUNDARY, MULTIPART_CONTENT
+        from django.test.client import encode_multipart
+
+        headers = dict(headers or {})
+        body = None
+        if files is not None:
+            body = encode_multipart(BOUNDARY, files)
+            headers['Content-Type'] = MULTIPART_CONTENT
+        elif json is not None:
+            body = _dumps(json).encode()
+            headers['Content-Type'] = 'application/json'
+
+        connection = self.connection()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            del self.local.connection
+            raise
+
+
+class Sampler:
+    """
+    Call `sample` every `interval` seconds in a thread, keeping the peak;
+    `cleanup`, if given, runs in that thread when it stops.
+    """
+
+    def __init__(self, sample, interval=0.1, cleanup=None):
+        self.sample = sample
+        self.interval = interval
+        self.cleanup = cleanup
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while True:
+                self.peak = max(self.peak, self.sample())
+                if self.stopped.wait(self.interval):
+                    return
+        finally:
+            if self.cleanup:
+                self.cleanup()
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of `pid` and its descendants, from /proc."""
+    parents = {}
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            # The command name in parentheses may contain spaces.
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        parents[int(stat.parent.name)] = int(fields[1])
+    tree = {pid}
+    for child, parent in sorted(parents.items()):
+        if parent in tree:
+            tree.add(child)
+    total = 0
+    for member in tree:
+        try:
+            status = Path(f'/proc/{member}/status').read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith('VmRSS:'):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def database_connections():
+    """Connections to the default database, not counting this one."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_stat_activity '
+            'WHERE datname = current_database() '
+            'AND pid <> pg_backend_pid()'
+        )
+        return cursor.fetchone()[0]
+
+
+class SlowClients:
+    """
+    Keep `count` connections to `base_url` busy sending a request one byte
+    every `interval` seconds, never finishing it, until stopped.
+    """
+
+    def __init__(self, base_url, count, interval=1.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.request = (
+            f'GET /api/recipes/ HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            'X-Slow: '
+        ).encode()
+        self.count = count
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=10)
+        if self.scheme == 'https':
+            sock = ssl.create_default_context().wrap_socket(
+                sock, server_hostname=self.host
+            )
+        return [sock, 0]
+
+    def run(self):
+        clients = []
+        try:
+            while not self.stopped.is_set():
+                for client in clients[:]:
+                    sock, sent = client
+                    # After the request line, one header that never ends.
+                    byte = self.request[sent:sent + 1] or b'x'
+                    try:
+                        sock.sendall(byte)
+                        client[1] += 1
+                    except OSError:
+                        # The server gave up on it; a slow client reconnects.
+                        sock.close()
+                        clients.remove(client)
+                while len(clients) < self.count:
+                    try:
+                        clients.append(self.connect())
+                    except OSError:
+                        break
+                self.stopped.wait(self.interval)
+        finally:
+            for sock, _ in clients:
+                sock.close()
+
+
+def _dumps(data):
+    return json.dumps(data)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_workload(workload, sessions, requests, concurrency, warmup):
+    for i in range(warmup):
+        workload(sessions[i % len(sessions)])
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            status, _ = workload(sessions[i % len(sessions)])
+        except Exception:
+            status = 599
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(timed, range(requests)))
+    else:
+        results = [timed(i) for i in range(requests)]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, status in results if status >= 400),
+        'throughput_rps': round(requests / wall, 2),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def measure_startup(runs):
+    """Median ms for a fresh interpreter to load the WSGI application."""
+    code = (
+        'import time; start = time.perf_counter(); import app.wsgi; '
+        'print(time.perf_counter() - start)'
+    )
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=PROJECT_DIR, env=os.environ,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        times.append(float(output) * 1000)
+    return round(statistics.median(times), 1)
+
+
+def measure(workload, sessions, args, concurrency):
+    """
+    run_workload(), plus the server's peak RSS when its pid is known and
+    the peak number of database connections on PostgreSQL.
+    """
+    from django.db import connection, connections
+
+    with contextlib.ExitStack() as stack:
+        memory = connection_count = None
+        if args.server_pid:
+            memory = stack.enter_context(
+                Sampler(lambda: process_tree_rss(args.server_pid))
+            )
+        if connection.vendor == 'postgresql':
+            connection_count = stack.enter_context(Sampler(
+                database_connections, cleanup=connections.close_all
+            ))
+        result = run_workload(
+            workload, sessions, args.requests, concurrency, args.warmup
+        )
+    if memory:
+        result['peak_rss_mb'] = round(memory.peak / 2 ** 20, 1)
+    if connection_count:
+        result['peak_db_connections'] = connection_count.peak
+    return result
+
+
+def median_result(runs):
+    """Combine repeated runs of a workload into their per-metric median."""
+    result = {
+        'requests': runs[0]['requests'],
+        'runs': len(runs),
+        'errors': max(run['errors'] for run in runs),
+    }
+    result['throughput_rps'] = round(
+        statistics.median(run['throughput_rps'] for run in runs), 2
+    )
+    for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+        result[key] = round(statistics.median(run[key] for run in runs), 3)
+    for key, _ in OPTIONAL_COLUMNS:
+        if key in runs[0]:
+            result[key] = round(
+                statistics.median(run[key] for run in runs), 1
+            )
+    return result
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']}ms vs baseline "
+                f"{expected['p95_ms']}ms"
+            )
+        if result['throughput_rps'] < expected['throughput_rps'] * (
+            1 - tolerance
+        ):
+            regressions.append(
+                f"{name}: {result['throughput_rps']} req/s vs baseline "
+                f"{expected['throughput_rps']} req/s"
+            )
+        if result['errors'] > expected['errors']:
+            regressions.append(
+                f"{name}: {result['errors']} errors vs baseline "
+                f"{expected['errors']}"
+            )
+    return regressions
+
+
+def print_results(results, out=sys.stdout):
+    columns = [
+        (key, title) for key, title in OPTIONAL_COLUMNS
+        if any(key in r for r in results.values())
+    ]
+    header = (
+        f"{'workload':<16}{'req/s':>10}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    ) + ''.join(f'{title:>10}' for _, title in columns)
+    out.write(header + '\n' + '-' * len(header) + '\n')
+    for name, r in results.items():
+        out.write(
+            f"{name:<16}{r['throughput_rps']:>10}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}"
+            + ''.join(f"{r.get(key, ''):>10}" for key, _ in columns) + '\n'
+        )
+
+
+def parse_args(argv):
+    from benchmarks.workloads import WORKLOADS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--recipes', type=int, help='Recipes per user.')
+    parser.add_argument(
+        '--workload', action='append', choices=WORKLOADS,
+        help='Workloads to run (default: all).'
+    )
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='Runs per workload; the median run is reported.'
+    )
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--base-url', help='Benchmark a running server.')
+    parser.add_argument(
+        '--server-pid', type=int,
+        help='Report the peak RSS of this server process and its workers.'
+    )
+    parser.add_argument(
+        '--slow-clients', type=int, default=0,
+        help='Extra connections sending their request a byte at a time.'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument(
+        '--profile', choices=('dev', 'prod'),
+        default=os.environ.get('DJANGO_ENV', 'prod'),
+        help='Settings profile (DJANGO_ENV) to benchmark.'
+    )
+    parser.add_argument(
+        '--startup', type=int, default=0, metavar='N',
+        help='Also time N cold starts of the WSGI application.'
+    )
+    parser.add_argument('--json', type=Path, help='Write results here.')
+    args = parser.parse_args(argv)
+    if not args.base_url and (args.server_pid or args.slow_clients):
+        parser.error('--server-pid and --slow-clients need --base-url')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    os.environ['DJANGO_ENV'] = args.profile
+    if os.environ['DJANGO_ENV'] == 'prod':
+        os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmarks-only')
+    # A single benchmark client would otherwise hit the per-user rates.
+    os.environ.setdefault('THROTTLE_ENABLED', '0')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import (
+        override_settings,
+        setup_test_environment,
+        teardown_test_environment,
+    )
+    from benchmarks.workloads import Session, WORKLOADS
+
+    scale = dict(SCALES[args.scale])
+    scale.update({
+        key: getattr(args, key) for key in scale if getattr(args, key)
+    })
+    names = args.workload or list(WORKLOADS)
+
+    in_process = not args.base_url
+    if in_process:
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        call_command(
+            'seed',
+            users=scale['users'],
+            recipes=scale['recipes'],
+            password=PASSWORD,
+            seed=args.seed,
+            stdout=open(os.devnull, 'w'),
+        )
+        transport = InProcessTransport()
+        concurrency = 1
+    else:
+        transport = HttpTransport(args.base_url)
+        concurrency = args.concurrency
+
+    try:
+        rng = random.Random(args.seed)
+        sessions = [
+            Session(transport, f'user{n}@example.com', PASSWORD, rng)
+            for n in range(scale['users'])
+        ]
+        for session in sessions:
+            session.prime()
+        runs = {name: [] for name in names}
+        slow_clients = (
+            SlowClients(args.base_url, args.slow_clients)
+            if args.slow_clients else contextlib.nullcontext()
+        )
+        with slow_clients:
+            for _ in range(args.repeat):
+                for name in names:
+                    runs[name].append(measure(
+                        WORKLOADS[name], sessions, args, concurrency
+                    ))
+        results = {name: median_result(runs[name]) for name in names}
+    finally:
+        if in_process:
+            media.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    meta = {
+        'scale': scale,
+        'transport': transport.name,
+        'database': connection.vendor,
+        'concurrency': concurrency,
+        'repeat': args.repeat,
+        'slow_clients': args.slow_clients,
+        'profile': os.environ['DJANGO_ENV'],
+        'conn_max_age': settings.DATABASES['default']['CONN_MAX_AGE'],
+        'db_pool': settings.DB_POOL,
+        'python': platform.python_version(),
+    }
+    report = {'meta': meta, 'results': results}
+    print_results(results)
+    if args.startup:
+        report['startup_ms'] = measure_startup(args.startup)
+        print(
+            f"\nStartup ({meta['profile']}): {report['startup_ms']} ms, "
+            f"median of {args.startup}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + '\n')
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if not args.baseline.exists():
+        print('No baseline to compare against.')
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    keys = (
+        'scale', 'transport', 'database', 'concurrency', 'slow_clients',
+        'profile', 'conn_max_age', 'db_pool',
+    )
+    if any(baseline['meta'].get(k) != meta[k] for k in keys):
+        print('Baseline was recorded with different settings, not comparing.')
+        return 0
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+    expected = baseline.get('startup_ms')
+    if args.startup and expected and (
+        report['startup_ms'] > expected * (1 + args.tolerance)
+    ):
+        regressions.append(
+            f"startup: {report['startup_ms']}ms vs baseline {expected}ms"
+        )
+    if regressions:
+        print('\nPERFORMANCE REGRESSION against baseline:', file=sys.stderr)
+        for regression in regressions:
+            print(f'  {regression}', file=sys.stderr)
+        return 1
+    print('\nNo regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
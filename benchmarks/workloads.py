@@ -0,0 +1,107 @@
+"""
+Scripted API workloads.
+
+A workload is a function taking a Session and returning one request to
+time. Sessions hold a logged-in client plus the tag and recipe IDs it
+discovered, so the same workloads run in-process and against a server.
+"""
+import io
+import json
+
+from PIL import Image
+
+
+class Session:
+    """A benchmark user: login token and IDs discovered through the API."""
+
+    def __init__(self, transport, email, password, rng):
+        self.transport = transport
+        self.email = email
+        self.password = password
+        self.rng = rng
+        status, body = transport.request(
+            'POST', '/api/tokens/',
+            json={'email': email, 'password': password},
+        )
+        if status != 200:
+            raise RuntimeError(f'Login failed for {email}: {status} {body!r}')
+        self.headers = {'Authorization': f"Token {json.loads(body)['token']}"}
+        self.tag_ids = [tag['id'] for tag in self.get_json('/api/tags/')]
+        self.recipe_ids = [r['id'] for r in self.get_json('/api/recipes/')]
+        if not self.recipe_ids:
+            raise RuntimeError(f'{email} has no recipes, run manage.py seed.')
+
+    def prime(self):
+        """Fetch every recipe once, so timed detail reads hit the cache."""
+        for recipe_id in self.recipe_ids:
+            self.request('GET', f'/api/recipes/{recipe_id}/')
+
+    def get_json(self, path):
+        status, body = self.transport.request('GET', path, headers=self.headers)
+        return json.loads(body)
+
+    def request(self, method, path, **kwargs):
+        return self.transport.request(
+            method, path, headers=self.headers, **kwargs
+        )
+
+
+def _jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 80, 40)).save(buffer, format='JPEG')
+    buffer.seek(0)
+    buffer.name = 'benchmark.jpg'
+    return buffer
+
+
+def list_filtered(session):
+    tags = session.rng.sample(session.tag_ids, min(2, len(session.tag_ids)))
+    query = f"?tags={','.join(map(str, tags))}" if tags else ''
+    return session.request('GET', f'/api/recipes/{query}')
+
+
+def list_async(session):
+    tags = session.rng.sample(session.tag_ids, min(2, len(session.tag_ids)))
+    query = f"?tags={','.join(map(str, tags))}" if tags else ''
+    return session.request('GET', f'/api/async/recipes/{query}')
+
+
+def detail(session):
+    recipe_id = session.rng.choice(session.recipe_ids)
+    return session.request('GET', f'/api/recipes/{recipe_id}/')
+
+
+def create_nested(session):
+    n = session.rng.randint(0, 10 ** 6)
+    return session.request('POST', '/api/recipes/', json={
+        'title': f'Benchmark recipe {n}',
+        'time_minutes': 30,
+        'price': '9.99',
+        'tags': [{'name': 'Benchmark'}, {'name': f'Tag {n % 50}'}],
+        'ingredients': [{'name': 'Salt'}, {'name': f'Ingredient {n % 80}'}],
+    })
+
+
+def image_upload(session):
+    recipe_id = session.rng.choice(session.recipe_ids)
+    return session.request(
+        'POST', f'/api/recipes/{recipe_id}/upload-image/',
+        files={'image': _jpeg()},
+    )
+
+
+def token_login(session):
+    return session.transport.request('POST', '/api/tokens/', json={
+        'email': session.email,
+        'password': session.password,
+    })
+
+
+WORKLOADS = {
+    'list_filtered': list_filtered,
+    'list_async': list_async,
+    'detail': detail,
+    'create_nested': create_nested,
+    'image_upload': image_upload,
+    'token_login': token_login,
+}
@@ -1,13 +1,69 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from core import models
 from django.utils.translation import gettext_lazy as _
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    On PostgreSQL, count with the planner's row estimate instead of
+    COUNT(*) once the estimate exceeds ADMIN_EXACT_COUNT_LIMIT: pg_class
+    statistics for a whole table, EXPLAIN for a filtered changelist. Smaller
+    results, and other databases, are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            estimate = self.estimate(queryset, connection)
+            if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+    def estimate(self, queryset, connection):
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+                # reltuples is -1 for a table that was never analyzed.
+                return max(0, row[0]) if row else 0
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows."""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to search results.
+    show_full_result_count = False
+    list_per_page = 50
+
+
 # Register your models here.
 class UserAdmin(BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
+    # Case-insensitive prefix search, backed by the UPPER(email) pattern
+    # index on PostgreSQL (see migration 0007).
+    search_fields = ['^email']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (
@@ -39,7 +95,34 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ['title', 'user', 'time_minutes', 'price']
+    list_select_related = ['user']
+    search_fields = ['^title']
+    autocomplete_fields = ['user']
+    raw_id_fields = ['tags', 'ingredients']
+
+
+class TagAdmin(LargeTableAdmin):
+    list_display = ['name', 'user']
+    list_select_related = ['user']
+    search_fields = ['^name']
+    autocomplete_fields = ['user']
+
+
+class IngredientAdmin(TagAdmin):
+    pass
+
+
+class JobAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at']
+    list_filter = ['status']
+    search_fields = ['^name']
+    readonly_fields = ['locked_by', 'locked_at', 'created_at', 'finished_at']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Job, JobAdmin)
@@ -0,0 +1,187 @@
+"""
+Per-user response caching.
+
+Each user has a cache version that core.signals bumps whenever one of
+their recipes, tags or ingredients changes. Cache keys include the
+version, so a write makes all of that user's cached responses
+unreachable and no explicit purge is needed.
+
+CachedListMixin caches the rendered JSON of list actions, already
+compressed for the client's encoding: a hot list is compressed once and
+then served as stored bytes.
+
+Recipe details are cached per recipe instead, so that editing one recipe
+does not evict the others: RecipeDetailSerializer writes the
+representation through when it saves a recipe, core.signals deletes it
+when the recipe, its tags or ingredients change, reads fill a missing
+entry without overwriting one, and check the cached owner before serving
+it.
+
+Responses read from a replica are never stored: the replica may not have
+the write that bumped the version yet, and its data would then be served
+as current until the next write.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from core.compression import compress, negotiate
+from core.routers import reading_from_replica
+
+
+def _version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def _initial_version():
+    # Seeded from the clock rather than 1, so a version evicted from the
+    # cache cannot restart at a value that older entries were stored under.
+    return time.time_ns() // 1000
+
+
+def user_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def user_cache_key(prefix, user_id, *parts):
+    digest = hashlib.sha1(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'{prefix}:{user_id}:{user_version(user_id)}:{digest}'
+
+
+def _recipe_detail_key(recipe_id):
+    return f'recipe-detail:{recipe_id}'
+
+
+def _recipe_detail_timeout():
+    # Representations hold signed image URLs, valid for MEDIA_URL_EXPIRE.
+    return min(
+        settings.RESPONSE_CACHE_TIMEOUT or 0, settings.MEDIA_URL_EXPIRE
+    )
+
+
+def get_recipe_detail(recipe_id, user_id, base_url):
+    """
+    The cached representation of a recipe rendered for `base_url`, or None
+    if there is none or the recipe does not belong to `user_id`.
+    """
+    return get_recipe_details([recipe_id], user_id, base_url).get(recipe_id)
+
+
+def get_recipe_details(recipe_ids, user_id, base_url):
+    """get_recipe_detail() for several recipes at once, by recipe id."""
+    if not _recipe_detail_timeout():
+        return {}
+    entries = cache.get_many([_recipe_detail_key(pk) for pk in recipe_ids])
+    details = {}
+    for pk in recipe_ids:
+        entry = entries.get(_recipe_detail_key(pk))
+        if entry is not None and entry[0] == user_id and base_url in entry[1]:
+            details[pk] = entry[1][base_url]
+    return details
+
+
+def set_recipe_detail(recipe_id, user_id, base_url, data):
+    """
+    Write through the representation of a recipe that was just saved,
+    replacing what is cached: representations for other hosts predate the
+    write. Absolute URLs depend on the host of the request, so entries are
+    kept per `base_url`.
+    """
+    timeout = _recipe_detail_timeout()
+    if timeout:
+        cache.set(
+            _recipe_detail_key(recipe_id),
+            (user_id, {base_url: dict(data)}),
+            timeout,
+        )
+
+
+def add_recipe_detail(recipe_id, user_id, base_url, data):
+    """
+    Cache a representation loaded on a read unless the recipe already has
+    an entry. Reads never overwrite: the entry may come from a write that
+    committed after this read loaded the recipe. A representation read
+    from a replica is not cached at all, it may predate the last write.
+    """
+    timeout = _recipe_detail_timeout()
+    if timeout and not reading_from_replica():
+        cache.add(
+            _recipe_detail_key(recipe_id),
+            (user_id, {base_url: dict(data)}),
+            timeout,
+        )
+
+
+def delete_recipe_details(recipe_ids):
+    cache.delete_many([_recipe_detail_key(pk) for pk in recipe_ids])
+
+
+class CachedListMixin:
+    """
+    Serve list responses for JSON clients from the per-user cache, stored
+    compressed with the negotiated encoding.
+    """
+
+    def list(self, request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if not timeout or not isinstance(
+            request.accepted_renderer, JSONRenderer
+        ):
+            return super().list(request, *args, **kwargs)
+
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        key = user_cache_key(
+            'list', request.user.pk, request.get_full_path(),
+            request.accepted_media_type, encoding or 'identity',
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            body, encoding = entry
+            response = HttpResponse(body)
+            if encoding is not None:
+                response['Content-Encoding'] = encoding
+            return self.cache_headers(request, response)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            body = request.accepted_renderer.render(
+                response.data,
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            # Setting the content marks the response as rendered, so DRF
+            # does not render it a second time.
+            response.content = body
+            if not reading_from_replica():
+                if encoding is not None:
+                    body = compress(body, encoding, best=True)
+                cache.set(key, (body, encoding), timeout)
+            self.cache_headers(request, response)
+        return response
+
+    def cache_headers(self, request, response):
+        response['Content-Type'] = request.accepted_media_type
+        patch_vary_headers(
+            response, ('Accept', 'Accept-Encoding', 'Authorization')
+        )
+        return response
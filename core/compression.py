@@ -0,0 +1,134 @@
+"""
+Content-negotiated response compression.
+
+gzip is always available; brotli ("br") and zstd are used when the
+optional `brotli` and `zstandard` packages are installed. The server
+prefers zstd, then br, then gzip among the encodings the client accepts.
+
+CompressionMiddleware compresses compressible responses larger than
+settings.COMPRESSION_MIN_SIZE. Responses that already carry a
+Content-Encoding (e.g. precompressed cache entries, see core/cache.py)
+pass through untouched.
+"""
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def _gzip(body, best):
+    return gzip.compress(body, compresslevel=9 if best else 6, mtime=0)
+
+
+def _brotli(body, best):
+    return brotli.compress(body, quality=11 if best else 5)
+
+
+def _zstd(body, best):
+    return zstandard.ZstdCompressor(level=19 if best else 3).compress(body)
+
+
+CODECS = {}
+if zstandard is not None:
+    CODECS['zstd'] = _zstd
+if brotli is not None:
+    CODECS['br'] = _brotli
+CODECS['gzip'] = _gzip
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|javascript|xml|yaml|vnd\.oai\.openapi)'
+    r'|application/[\w.+-]+\+(json|xml))'
+)
+_ACCEPT_ENCODING = re.compile(r'([\w*-]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def negotiate(accept_encoding, supported=CODECS):
+    """
+    The preferred encoding of `supported` (default: all CODECS, in server
+    preference order) acceptable to the client, or None.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for match in _ACCEPT_ENCODING.finditer(accept_encoding.lower()):
+        try:
+            weights[match.group(1)] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+    best, best_weight = None, 0
+    for encoding in supported:
+        weight = weights.get(encoding, weights.get('*', 0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body, encoding, best=False):
+    """
+    Compress `body` with `encoding`. `best` trades CPU for size and is
+    meant for bodies compressed once and served many times.
+    """
+    return CODECS[encoding](body, best)
+
+
+def is_compressible(response):
+    return bool(COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')))
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress_response(
+            request, await self.get_response(request)
+        )
+
+    def compress_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or response.status_code not in (200, 201)
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+            or not is_compressible(response)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The bytes changed, so the ETag can only be weak now.
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,46 @@
+"""
+Database execute wrappers scoped to the current context.
+
+connection.execute_wrapper() only sees queries run through that connection
+object, and connection objects are per thread. Under ASGI an async
+middleware runs on the event loop while the view's queries run in
+sync_to_async threads, each with its own connections, so a wrapper entered
+by the middleware would miss them.
+
+Wrappers entered with execute_wrapper() below are kept in a ContextVar
+instead. asgiref copies the context into sync_to_async threads, and one
+dispatching wrapper installed on every connection applies them, so the
+same code works for sync and async requests.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_wrappers = ContextVar('execute_wrappers', default=())
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Apply `wrapper` to queries on any connection in this context."""
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _wrappers.reset(token)
+
+
+def _dispatch(execute, sql, params, many, context):
+    wrappers = _wrappers.get()
+    for wrapper in reversed(wrappers):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects of the same connection object.
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
@@ -0,0 +1,152 @@
+"""
+Idempotency-Key support for write endpoints that clients retry.
+
+A client sends a unique `Idempotency-Key` header with a write and reuses
+it when retrying the same write. The first request claims the key with
+cache.add(), which is atomic, and its response is stored under the key
+for IDEMPOTENCY_KEY_TIMEOUT seconds. Retries then get the stored response
+back, marked with an `Idempotent-Replayed: true` header, instead of
+performing the write again.
+
+A retry that arrives while the first request is still running gets a 409
+with Retry-After rather than waiting on it. Reusing a key for a different
+request (method, path or body) is a 422. Server errors and exceptions
+release the key, so the write can be retried. Keys are scoped to the
+user, or for anonymous requests to the client address.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    OpenApiTypes,
+    extend_schema,
+)
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+def idempotent(view_method):
+    """
+    Decorate a view method to honour the Idempotency-Key header. On
+    custom actions it goes above @action, so the schema sees the header.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get(HEADER)
+        if not idempotency_key:
+            return view_method(self, request, *args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            raise ValidationError({
+                HEADER: f'At most {MAX_KEY_LENGTH} characters are allowed.'
+            })
+
+        key = _cache_key(request, idempotency_key)
+        fingerprint = _fingerprint(request)
+        if not cache.add(
+            key, (PENDING, fingerprint), settings.IDEMPOTENCY_LOCK_TIMEOUT
+        ):
+            return _replay(cache.get(key), fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(key)
+            raise
+        if response.status_code >= 500:
+            cache.delete(key)
+            return response
+
+        headers = {
+            name: value for name, value in response.items()
+            if name.lower() != 'content-type'
+        }
+        cache.set(
+            key,
+            (DONE, fingerprint, response.status_code, response.data, headers),
+            settings.IDEMPOTENCY_KEY_TIMEOUT,
+        )
+        return response
+
+    return extend_schema(parameters=[
+        OpenApiParameter(
+            HEADER, OpenApiTypes.STR, OpenApiParameter.HEADER,
+            description='Unique key making retries of this request replay '
+                        'its response instead of repeating it.',
+        ),
+    ])(wrapper)
+
+
+def _cache_key(request, idempotency_key):
+    if request.user.is_authenticated:
+        owner = request.user.pk
+    else:
+        # Anonymous callers are told apart by address (honouring
+        # NUM_PROXIES, as the throttles do), so one cannot replay or
+        # block another's request by guessing its key.
+        owner = f'anonymous:{BaseThrottle().get_ident(request)}'
+    digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    return f'idempotency:{owner}:{digest}'
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256(
+        f'{request.method} {request.get_full_path()}\n'.encode()
+    )
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    digest.update(
+        json.dumps(data, sort_keys=True, default=_file_digest).encode()
+    )
+    return digest.hexdigest()
+
+
+def _file_digest(value):
+    if not isinstance(value, UploadedFile):
+        return str(value)
+    digest = hashlib.sha256()
+    for chunk in value.chunks():
+        digest.update(chunk)
+    value.seek(0)
+    return digest.hexdigest()
+
+
+def _replay(entry, fingerprint):
+    if entry is None or entry[0] == PENDING:
+        # Either still running, or it just failed and released the key:
+        # both ways the client should try again shortly.
+        if entry is not None and entry[1] != fingerprint:
+            return _mismatch()
+        return Response(
+            {'detail': 'A request with this Idempotency-Key is in progress.'},
+            status=status.HTTP_409_CONFLICT,
+            headers={'Retry-After': '1'},
+        )
+
+    _, stored_fingerprint, status_code, data, headers = entry
+    if stored_fingerprint != fingerprint:
+        return _mismatch()
+    response = Response(data, status=status_code, headers=headers)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _mismatch():
+    return Response(
+        {'detail': 'This Idempotency-Key was used for a different request.'},
+        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
@@ -0,0 +1,203 @@
+"""
+Resized image variants, rendered on first request and cached on disk.
+
+Variants live under MEDIA_ROOT/IMAGE_VARIANT_DIR, named after a hash of
+the source image name; uploads get fresh names, so a cached variant never
+goes stale. Only the IMAGE_VARIANT_SIZES bounding boxes can be requested,
+which bounds both the work a client can cause and the cache's key space.
+
+Concurrent requests for the same missing variant are coalesced: threads
+of one process wait on a per-variant lock and processes on an flock of a
+lock file, so only one of them renders it and the rest serve the result.
+The lock file is removed once the render is done.
+When the cache outgrows IMAGE_VARIANT_CACHE_SIZE the least recently served
+variants are removed. Finding them walks the whole cache, so each process
+only does it when its running total (the size found by its last walk plus
+what it rendered since) passes the limit. Renders by other processes are
+not in that total, so with several processes the cache can briefly
+exceed the limit.
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads are coalesced.
+    fcntl = None
+
+FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+if features.check('avif'):
+    FORMATS['avif'] = 'AVIF'
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jpg': 'image/jpeg',
+}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Cache root -> bytes in it, as far as this process knows.
+_sizes = {}
+_sizes_guard = threading.Lock()
+
+
+def allowed_sizes():
+    return [
+        tuple(int(part) for part in size.split('x'))
+        for size in settings.IMAGE_VARIANT_SIZES
+    ]
+
+
+def variant_name(source_name, width, height, fmt):
+    """Path of a variant relative to MEDIA_ROOT."""
+    digest = hashlib.sha1(source_name.encode()).hexdigest()
+    return os.path.join(
+        settings.IMAGE_VARIANT_DIR, digest[:2],
+        f'{digest}-{width}x{height}.{fmt}'
+    )
+
+
+def get_variant(storage, source_name, width, height, fmt):
+    """
+    Return the name (relative to MEDIA_ROOT) of the variant of the image
+    `source_name` in `storage`, rendering it first if needed.
+    """
+    name = variant_name(source_name, width, height, fmt)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    if _touch(path):
+        return name
+
+    with _coalesce(path):
+        if _touch(path):
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with storage.open(source_name, 'rb') as source:
+            render(source, path, width, height, fmt)
+    _grow(os.path.getsize(path))
+    return name
+
+
+def render(source, path, width, height, fmt):
+    """Fit the image within width x height and write it to `path`."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, height), Image.Resampling.LANCZOS)
+        if fmt == 'jpg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            image.save(
+                temp_path, FORMATS[fmt],
+                quality=settings.IMAGE_VARIANT_QUALITY
+            )
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _root():
+    return os.path.join(settings.MEDIA_ROOT, settings.IMAGE_VARIANT_DIR)
+
+
+def _grow(size):
+    """Count a rendered variant, evicting once the cache may be too big."""
+    root = _root()
+    with _sizes_guard:
+        total = _sizes.get(root)
+        if total is not None:
+            total = _sizes[root] = total + size
+    if total is None or total > settings.IMAGE_VARIANT_CACHE_SIZE:
+        evict()
+
+
+def evict():
+    """Remove least recently served variants above the size limit."""
+    root = _root()
+    entries = []
+    total = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.lock', '.tmp')):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    limit = settings.IMAGE_VARIANT_CACHE_SIZE
+    if total > limit:
+        # Trim to 90%, so this process renders a tenth of the limit before
+        # it walks the cache again.
+        entries.sort()
+        for _, size, path in entries:
+            if total <= limit * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    with _sizes_guard:
+        _sizes[root] = total
+
+
+def _touch(path):
+    """Mark a cached variant as used; False if it does not exist."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+@contextmanager
+def _coalesce(path):
+    with _locks_guard:
+        entry = _locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lock_file = _lock_file(f'{path}.lock')
+            try:
+                yield
+            finally:
+                # Waiters still holding the removed file retry on a new one.
+                os.remove(lock_file.name)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[path]
+
+
+def _lock_file(lock_path):
+    """Open and flock `lock_path`, retrying if it is removed meanwhile."""
+    while True:
+        lock_file = open(lock_path, 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            current = os.stat(lock_path)
+        except FileNotFoundError:
+            current = None
+        if current and current.st_ino == os.fstat(lock_file.fileno()).st_ino:
+            return lock_file
+        # The holder we waited for removed it: lock the file now in place.
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
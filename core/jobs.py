@@ -0,0 +1,330 @@
+"""
+Deferred work on a database-backed queue, without an external broker.
+
+Tasks are functions registered with @task; `task.enqueue(**payload)`
+stores a core.models.Job row in the caller's transaction, so a rolled back
+request leaves no job behind, and `manage.py run_jobs` executes them.
+Workers claim jobs so that no two of them run the same one:
+
+- with SELECT ... FOR UPDATE SKIP LOCKED where the database supports it
+  (PostgreSQL), so workers never wait on rows another one is claiming;
+- elsewhere (SQLite) with one conditional UPDATE per job, matching only
+  while the job is still claimable.
+
+A failing job is retried up to its task's `max_attempts`, after an
+exponential backoff starting at JOBS_RETRY_BACKOFF seconds. Jobs that a
+crashed worker left running for JOBS_LOCK_TIMEOUT are claimed again. A
+task's `concurrency` caps how many of its jobs run at once; the cap is
+checked when claiming, so workers claiming at the same moment can briefly
+exceed it.
+
+Tasks live in `jobs` modules of installed apps, imported at startup. With
+JOBS_EAGER, enqueue() runs the job immediately instead, for development
+without a worker.
+"""
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core import metrics
+from core.models import Job
+
+_tasks = {}
+
+JOBS = metrics.Counter(
+    'jobs_total',
+    'Jobs run by this process, by task and outcome.',
+    ('task', 'outcome'),
+)
+JOB_DURATION = metrics.Histogram(
+    'job_duration_seconds',
+    'Wall time spent running a job.',
+    ('task',), metrics.DURATION_BUCKETS,
+)
+
+
+class QueueCollector:
+    """Jobs waiting, running and failed, read from the database."""
+    name = 'jobs'
+
+    def collect(self):
+        yield f'# HELP {self.name} Jobs in the queue, by task and status.'
+        yield f'# TYPE {self.name} gauge'
+        rows = (
+            Job.objects
+            .exclude(status=Job.SUCCEEDED)
+            .values_list('name', 'status')
+            .annotate(count=Count('id'))
+            .order_by('name', 'status')
+        )
+        for name, status, count in rows:
+            labels = metrics._labels(('task', 'status'), (name, status))
+            yield f'{self.name}{{{labels}}} {count}'
+
+
+metrics.REGISTRY.extend([JOBS, JOB_DURATION, QueueCollector()])
+
+
+class Task:
+
+    def __init__(self, func, name, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, run_at=None, **payload):
+        """Queue a run of the task with `payload` as keyword arguments."""
+        job = Job.objects.create(
+            name=self.name,
+            payload=payload,
+            run_at=run_at or timezone.now(),
+            max_attempts=self.max_attempts,
+        )
+        if settings.JOBS_EAGER:
+            job.status = Job.RUNNING
+            job.attempts = 1
+            job.locked_by = 'eager'
+            job.save(update_fields=['status', 'attempts', 'locked_by'])
+            execute(job, 'eager')
+        return job
+
+
+def task(name=None, *, max_attempts=3, concurrency=None):
+    """
+    Register a function as a task, by default under its dotted path.
+    JSON-serializable keyword arguments only: they are stored in the job.
+    """
+
+    def decorator(func):
+        registered = Task(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            max_attempts,
+            concurrency,
+        )
+        _tasks[registered.name] = registered
+        return registered
+
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('jobs')
+
+
+def claim(worker_id, limit):
+    """Claim up to `limit` ready jobs for `worker_id` and return them."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    claimable = (
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=stale)
+    )
+    candidates = (
+        Job.objects.filter(claimable)
+        .order_by('run_at', 'id')
+        .values_list('id', 'name')
+    )
+    claimed = {
+        'status': Job.RUNNING,
+        'attempts': F('attempts') + 1,
+        'locked_by': worker_id,
+        'locked_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_ids = _within_concurrency(
+                candidates.select_for_update(skip_locked=True), limit
+            )
+            Job.objects.filter(id__in=job_ids).update(**claimed)
+    else:
+        job_ids = [
+            job_id
+            for job_id in _within_concurrency(candidates, limit)
+            if Job.objects.filter(claimable, id=job_id).update(**claimed)
+        ]
+    return list(
+        Job.objects.filter(id__in=job_ids, locked_by=worker_id)
+        .order_by('run_at', 'id')
+    )
+
+
+def _within_concurrency(candidates, limit):
+    """
+    Ids of up to `limit` of the (id, name) `candidates`, in order, that
+    their tasks' limits leave room for.
+
+    Tasks at their limit are excluded in the query, so their jobs cannot
+    fill the slice and hold back the jobs queued behind them. A task that
+    reaches its limit within a slice is excluded from the next one; that
+    takes at most one more query per limited task.
+    """
+    remaining = {
+        name: registered.concurrency
+        for name, registered in _tasks.items()
+        if registered.concurrency
+    }
+    if remaining:
+        running = (
+            Job.objects.filter(status=Job.RUNNING, name__in=remaining)
+            .values_list('name')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for name, count in running:
+            remaining[name] -= count
+
+    job_ids = []
+    while len(job_ids) < limit:
+        wanted = limit - len(job_ids)
+        saturated = [name for name, left in remaining.items() if left <= 0]
+        batch = list(
+            candidates.exclude(name__in=saturated)
+            .exclude(id__in=job_ids)[:wanted]
+        )
+        for job_id, name in batch:
+            if name in remaining:
+                if remaining[name] <= 0:
+                    continue
+                remaining[name] -= 1
+            job_ids.append(job_id)
+        if len(batch) < wanted:
+            break
+    return job_ids
+
+
+def execute(job, worker_id):
+    """Run a claimed job and record its outcome."""
+    registered = _tasks.get(job.name)
+    start = time.perf_counter()
+    try:
+        if registered is None:
+            raise LookupError(f'No task is registered as {job.name!r}.')
+        registered.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if registered is not None and job.attempts < job.max_attempts:
+            outcome = 'retried'
+            fields = {
+                'status': Job.QUEUED,
+                'run_at': timezone.now() + timedelta(
+                    seconds=backoff(job.attempts)
+                ),
+            }
+        else:
+            outcome = 'failed'
+            fields = {'status': Job.FAILED, 'finished_at': timezone.now()}
+        fields['last_error'] = error
+    else:
+        outcome = 'succeeded'
+        fields = {'status': Job.SUCCEEDED, 'finished_at': timezone.now()}
+
+    JOBS.inc((job.name, outcome))
+    JOB_DURATION.observe((job.name,), time.perf_counter() - start)
+    # A job reclaimed as stale belongs to its new worker now.
+    Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=worker_id
+    ).update(locked_by='', locked_at=None, **fields)
+    return outcome
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that failed `attempts` times."""
+    delay = min(
+        settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_BACKOFF_MAX,
+    )
+    # Jitter spreads out retries of jobs that failed together.
+    return delay * random.uniform(0.5, 1)
+
+
+def prune():
+    """Delete succeeded jobs older than JOBS_KEEP_SUCCEEDED seconds."""
+    before = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_SUCCEEDED)
+    Job.objects.filter(
+        status=Job.SUCCEEDED, finished_at__lt=before
+    ).delete()
+
+
+class Worker:
+    """
+    Claims and runs jobs on `concurrency` threads; with a concurrency of
+    one, jobs run on the calling thread.
+    """
+    PRUNE_INTERVAL = 300
+
+    def __init__(self, concurrency=1, poll_interval=1.0, worker_id=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.id = (
+            worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        )[:64]
+        self._stop = threading.Event()
+        self._next_prune = 0.0
+
+    def stop(self):
+        """Finish the running jobs and return from run()."""
+        self._stop.set()
+
+    def run(self, burst=False):
+        """
+        Run jobs until stop() is called or, with `burst`, until no job is
+        ready to run.
+        """
+        if self.concurrency == 1:
+            return self._run_inline(burst)
+        with ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix='job'
+        ) as pool:
+            running = set()
+            while not self._stop.is_set():
+                self._maybe_prune()
+                running = {future for future in running if not future.done()}
+                free = self.concurrency - len(running)
+                jobs = claim(self.id, free) if free else []
+                for job in jobs:
+                    running.add(pool.submit(self._execute, job))
+                if jobs and len(jobs) == free:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                elif not jobs:
+                    if burst and not running:
+                        break
+                    self._stop.wait(self.poll_interval)
+
+    def _run_inline(self, burst):
+        while not self._stop.is_set():
+            self._maybe_prune()
+            jobs = claim(self.id, 1)
+            if jobs:
+                execute(jobs[0], self.id)
+            elif burst:
+                break
+            else:
+                self._stop.wait(self.poll_interval)
+
+    def _execute(self, job):
+        try:
+            return execute(job, self.id)
+        finally:
+            close_old_connections()
+
+    def _maybe_prune(self):
+        if time.monotonic() >= self._next_prune:
+            prune()
+            self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
@@ -0,0 +1,40 @@
+"""
+Render the OpenAPI schema into files served by core.schema.CachedSchemaView.
+
+Run at deploy time with SCHEMA_ROOT pointing at the output directory.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import RENDERERS, compress, generate
+
+
+class Command(BaseCommand):
+    help = 'Write openapi.yaml/openapi.json (and .gz copies) for the API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=settings.SCHEMA_ROOT,
+            help='Defaults to settings.SCHEMA_ROOT.'
+        )
+        parser.add_argument(
+            '--no-compress', action='store_true',
+            help='Do not write precompressed .gz copies.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['output_dir']:
+            raise CommandError('Pass --output-dir or set SCHEMA_ROOT.')
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        for fmt in RENDERERS:
+            body = generate(fmt)
+            path = output_dir / f'openapi.{fmt}'
+            path.write_bytes(body)
+            if not options['no_compress']:
+                path.with_name(path.name + '.gz').write_bytes(compress(body))
+            self.stdout.write(f'Wrote {path}')
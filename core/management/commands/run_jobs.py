@@ -0,0 +1,44 @@
+"""
+Run queued background jobs, see core.jobs.
+"""
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Claim and run queued jobs until stopped with SIGINT or SIGTERM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+            help='Jobs run at once. Defaults to settings.JOBS_CONCURRENCY.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when no job is ready.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is ready to run.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=max(1, options['concurrency']),
+            poll_interval=options['poll_interval'],
+        )
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running jobs...')
+            worker.stop()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+        self.stdout.write(
+            f'Worker {worker.id} running up to {worker.concurrency} jobs.'
+        )
+        worker.run(burst=options['burst'])
@@ -0,0 +1,287 @@
+"""
+Generate users, tags, ingredients and recipes for benchmarks and staging.
+
+    python manage.py seed --users 10000 --recipes 100
+
+The output is deterministic for a given --seed. Tag and ingredient usage
+follows a Zipf distribution, so a few tags (e.g. "Dinner") appear on most
+recipes and the long tail is rare, as in real data.
+
+Rows are generated in batches and written with raw multi-row inserts, or
+with COPY on Postgres, with primary keys assigned up front so no ids have
+to be read back. Every user shares one precomputed password hash for
+--password and has the email user<n>@example.com, so load generators can
+log in as any of them. The command bypasses model signals and expects no
+concurrent writers while it runs.
+"""
+import io
+import random
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Crispy', 'Smoky', 'Zesty', 'Roasted', 'Grilled',
+    'Braised', 'Tangy', 'Rustic', 'Herby', 'Sticky', 'Hearty', 'Light',
+]
+DISHES = [
+    'Curry', 'Stew', 'Salad', 'Tacos', 'Risotto', 'Pasta', 'Soup', 'Pie',
+    'Noodles', 'Burger', 'Casserole', 'Stir Fry', 'Flatbread', 'Bowl',
+]
+# Ordered by popularity: the Zipf weights favour the first entries.
+TAGS = [
+    'Dinner', 'Quick', 'Vegetarian', 'Healthy', 'Lunch', 'Comfort',
+    'Budget', 'Italian', 'Vegan', 'Spicy', 'Breakfast', 'Dessert',
+    'Gluten Free', 'One Pot', 'Mexican', 'Indian', 'Kids', 'Baking',
+    'Summer', 'Winter', 'Thai', 'Party', 'Grill', 'French', 'Japanese',
+    'Low Carb', 'Keto',
+]
+INGREDIENTS = [
+    'Salt', 'Olive Oil', 'Pepper', 'Garlic', 'Onion', 'Butter', 'Tomato',
+    'Flour', 'Egg', 'Sugar', 'Milk', 'Lemon', 'Chicken', 'Rice', 'Cheese',
+    'Carrot', 'Potato', 'Chili', 'Ginger', 'Basil', 'Cream', 'Beef',
+    'Cumin', 'Paprika', 'Spinach', 'Coriander', 'Mushroom', 'Pasta',
+    'Soy Sauce', 'Lime', 'Honey', 'Beans', 'Tofu', 'Yogurt', 'Bell Pepper',
+    'Chickpeas', 'Lentils', 'Coconut Milk', 'Zucchini', 'Noodles',
+]
+DESCRIPTION_WORDS = [
+    'simmer', 'stir', 'season', 'serve', 'fresh', 'slowly', 'golden',
+    'until', 'tender', 'with', 'and', 'the', 'sauce', 'heat', 'gently',
+]
+
+
+def zipf_cum_weights(n, exponent):
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+class BulkWriter:
+    """Write plain row tuples straight into a model's table."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def write(self, model, attnames, rows):
+        if not rows:
+            return
+        fields = [model._meta.get_field(name) for name in attnames]
+        # Fill every other column with its default once, not per row.
+        extra = [
+            field for field in model._meta.concrete_fields
+            if field.attname not in attnames and not field.primary_key
+        ]
+        defaults = tuple(self.default(field) for field in extra)
+        columns = [
+            self.connection.ops.quote_name(field.column)
+            for field in fields + extra
+        ]
+        table = self.connection.ops.quote_name(model._meta.db_table)
+        if defaults:
+            rows = [row + defaults for row in rows]
+
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == 'postgresql':
+                self.copy(cursor, table, columns, rows)
+            else:
+                self.insert(cursor, table, columns, rows)
+
+    def default(self, field):
+        if getattr(field, 'auto_now', False) or getattr(
+            field, 'auto_now_add', False
+        ):
+            return timezone.now()
+        return field.get_db_prep_save(field.get_default(), self.connection)
+
+    def copy(self, cursor, table, columns, rows):
+        sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        data = ''.join(
+            '\t'.join(copy_value(value) for value in row) + '\n'
+            for row in rows
+        )
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(sql, io.StringIO(data))
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(data)
+
+    def insert(self, cursor, table, columns, rows):
+        max_params = self.connection.features.max_query_params or 10000
+        per_statement = max(1, min(500, max_params // len(columns)))
+        placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                + ', '.join([placeholder] * len(chunk)),
+                [value for row in chunk for value in row],
+            )
+
+
+class Command(BaseCommand):
+    help = 'Seed the database with generated users, tags, ingredients and recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--recipes', type=int, default=50, help='Recipes per user.'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=15, help='Tags per user.'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=30, help='Ingredients per user.'
+        )
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Zipf exponent of tag and ingredient popularity.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Users per batch is chosen so a batch holds about this '
+                 'many recipes.'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        connection = connections[options['database']]
+        self.writer = BulkWriter(connection)
+        self.password = make_password(options['password'])
+        self.tag_names = TAGS[:options['tags']]
+        self.ingredient_names = INGREDIENTS[:options['ingredients']]
+        self.tag_weights = zipf_cum_weights(
+            len(self.tag_names), options['zipf']
+        )
+        self.ingredient_weights = zipf_cum_weights(
+            len(self.ingredient_names), options['zipf']
+        )
+
+        User = get_user_model()
+        models = [User, Tag, Ingredient, Recipe]
+        self.next_id = {
+            model: (model.objects.using(options['database'])
+                    .aggregate(Max('pk'))['pk__max'] or 0) + 1
+            for model in models
+        }
+        first_user = User.objects.using(options['database']).count()
+
+        users_per_batch = max(
+            1, options['batch_size'] // max(1, options['recipes'])
+        )
+        with transaction.atomic(using=options['database']):
+            for start in range(0, options['users'], users_per_batch):
+                stop = min(options['users'], start + users_per_batch)
+                self.seed_batch(range(first_user + start, first_user + stop))
+                self.stdout.write(f"Seeded {stop}/{options['users']} users")
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(),
+                    models + [Recipe.tags.through, Recipe.ingredients.through]
+                ):
+                    cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['users']} users with "
+            f"{options['recipes']} recipes each."
+        ))
+
+    def allocate(self, model, count):
+        start = self.next_id[model]
+        self.next_id[model] = start + count
+        return range(start, start + count)
+
+    def seed_batch(self, user_numbers):
+        rng = self.rng
+        options = self.options
+        users, tags, ingredients, recipes = [], [], [], []
+        recipe_tags, recipe_ingredients = [], []
+
+        for user_id, n in zip(
+            self.allocate(get_user_model(), len(user_numbers)), user_numbers
+        ):
+            users.append((
+                user_id, f'user{n}@example.com', f'User {n}', self.password,
+                True, False, False,
+            ))
+            tag_ids = self.allocate(Tag, len(self.tag_names))
+            tags.extend(
+                (tag_id, user_id, name)
+                for tag_id, name in zip(tag_ids, self.tag_names)
+            )
+            ingredient_ids = self.allocate(
+                Ingredient, len(self.ingredient_names)
+            )
+            ingredients.extend(
+                (ingredient_id, user_id, name)
+                for ingredient_id, name in zip(
+                    ingredient_ids, self.ingredient_names
+                )
+            )
+
+            for recipe_id in self.allocate(Recipe, options['recipes']):
+                recipes.append((
+                    recipe_id,
+                    user_id,
+                    f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                    rng.randint(5, 180),
+                    Decimal(rng.randint(100, 5000)) / 100,
+                    ' '.join(rng.choices(DESCRIPTION_WORDS, k=12)),
+                ))
+                if tag_ids:
+                    chosen = set(rng.choices(
+                        tag_ids, cum_weights=self.tag_weights,
+                        k=rng.randint(0, 4)
+                    ))
+                    recipe_tags.extend((recipe_id, t) for t in chosen)
+                if ingredient_ids:
+                    chosen = set(rng.choices(
+                        ingredient_ids, cum_weights=self.ingredient_weights,
+                        k=rng.randint(2, 10)
+                    ))
+                    recipe_ingredients.extend((recipe_id, i) for i in chosen)
+
+        write = self.writer.write
+        write(get_user_model(), [
+            'id', 'email', 'name', 'password',
+            'is_active', 'is_staff', 'is_superuser',
+        ], users)
+        write(Tag, ['id', 'user_id', 'name'], tags)
+        write(Ingredient, ['id', 'user_id', 'name'], ingredients)
+        write(Recipe, [
+            'id', 'user_id', 'title', 'time_minutes', 'price', 'description',
+        ], recipes)
+        write(Recipe.tags.through, ['recipe_id', 'tag_id'], recipe_tags)
+        write(
+            Recipe.ingredients.through,
+            ['recipe_id', 'ingredient_id'],
+            recipe_ingredients
+        )
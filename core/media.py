@@ -0,0 +1,155 @@
+"""
+Serving media files without streaming them through Python.
+
+serve() hands the file to the front-end server when MEDIA_SENDFILE names
+one, after the view has done its permission checks:
+
+- "nginx": X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX + name, which
+  must be an internal location aliased to MEDIA_ROOT:
+
+      location /protected-media/ {
+          internal;
+          alias /vol/web/media/;
+      }
+
+- "apache": X-Sendfile with the absolute path (mod_xsendfile; lighttpd
+  understands the same header).
+
+The server then answers Range and conditional requests itself. Without a
+front-end server (development, tests) Django streams the file, honouring
+ETag/Last-Modified validators and single byte ranges.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.negotiation import BaseContentNegotiation
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileContentNegotiation(BaseContentNegotiation):
+    """
+    For views returning files: any Accept header is fine, and errors are
+    rendered with the view's first renderer.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def serve(request, storage, name, content_type=None, cache_control=None):
+    """Respond with the file `name` of a FileSystemStorage."""
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404()
+    if content_type is None:
+        content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+
+    backend = settings.MEDIA_SENDFILE
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = quote(
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + name
+            )
+        else:
+            response['X-Sendfile'] = path
+    else:
+        response = _stream(request, path, stat, content_type)
+
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def _stream(request, path, stat, content_type):
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    def validators(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return validators(not_modified)
+
+    byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+    if byte_range is None:
+        return validators(
+            FileResponse(open(path, 'rb'), content_type=content_type)
+        )
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return validators(response)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read(path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return validators(response)
+
+
+def _byte_range(request, size, etag, last_modified):
+    """
+    The (start, end) byte range requested, None to send the whole file, or
+    False if the range cannot be satisfied. Multiple ranges are answered
+    with the whole file, which RFC 9110 allows.
+    """
+    header = request.headers.get('Range')
+    if not header:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range not in (etag, http_date(last_modified)):
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
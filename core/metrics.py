@@ -0,0 +1,249 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware opens a RequestMetrics for every request. Query
+count and time are collected through database execute wrappers, while
+InstrumentedViewMixin adds serializer and render time for DRF views. The
+totals are returned in a Server-Timing header and aggregated into the
+per-process histograms exposed by core.views.metrics in the Prometheus
+text format.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestMetrics:
+    """Timings (in seconds) collected while handling one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.db_queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their time."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.db_queries += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+
+    def server_timing(self):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}'
+
+        return ', '.join([
+            f'total;dur={ms(self.total)}',
+            f'db;dur={ms(self.db)};desc="{self.db_queries} queries"',
+            f'serialize;dur={ms(self.serialize)}',
+            f'render;dur={ms(self.render)}',
+        ])
+
+
+def current():
+    """The RequestMetrics of the request being handled, if any."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        metrics.finish()
+
+
+@contextmanager
+def timed(attr):
+    """Add the time spent in the block to the current request's `attr`."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(
+            metrics, attr,
+            getattr(metrics, attr) + time.perf_counter() - start
+        )
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{{{_labels(self.labelnames, labels)}}} {value}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._series.items()
+            )
+        for labels, (counts, total, count) in series:
+            label_str = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield (
+                    f'{self.name}_bucket{{{label_str},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            yield f'{self.name}_sum{{{label_str}}} {total}'
+            yield f'{self.name}_count{{{label_str}}} {count}'
+
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+
+
+ROUTE_LABELS = ('route', 'method')
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'Requests handled, by route, method and status.',
+    ('route', 'method', 'status'),
+)
+DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Wall time spent handling the request.',
+    ROUTE_LABELS, DURATION_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing database queries.',
+    ROUTE_LABELS, DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries executed.',
+    ROUTE_LABELS, QUERY_COUNT_BUCKETS,
+)
+SERIALIZE_DURATION = Histogram(
+    'http_request_serialize_duration_seconds',
+    'Time spent in serializer to_representation.',
+    ROUTE_LABELS, DURATION_BUCKETS,
+)
+RENDER_DURATION = Histogram(
+    'http_request_render_duration_seconds',
+    'Time spent rendering the response body.',
+    ROUTE_LABELS, DURATION_BUCKETS,
+)
+
+REGISTRY = [
+    REQUESTS,
+    DURATION,
+    DB_DURATION,
+    DB_QUERIES,
+    SERIALIZE_DURATION,
+    RENDER_DURATION,
+]
+
+
+def record(route, method, status, metrics):
+    labels = (route, method)
+    REQUESTS.inc((route, method, status))
+    DURATION.observe(labels, metrics.total)
+    DB_DURATION.observe(labels, metrics.db)
+    DB_QUERIES.observe(labels, metrics.db_queries)
+    SERIALIZE_DURATION.observe(labels, metrics.serialize)
+    RENDER_DURATION.observe(labels, metrics.render)
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+class InstrumentedViewMixin:
+    """
+    Record serializer and render time of a DRF view in the request metrics.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            with timed('serialize'):
+                return to_representation(instance)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if hasattr(response, 'render') and not response.is_rendered:
+            with timed('render'):
+                response.render()
+        return response
@@ -0,0 +1,145 @@
+"""
+Middleware for the core app.
+"""
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from core import metrics
+from core.dbwrappers import execute_wrapper
+from core.routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe-method requests read from replicas, except for clients that
+    wrote recently: after an unsafe request the client is pinned to the
+    primary for settings.REPLICA_STICKY_SECONDS (read-your-writes).
+
+    Writes with an Authorization header pin that credential. Anonymous
+    writes (signup, login) get a short-lived sticky cookie instead, and
+    pin the token a login issues, so the token is honoured on the next
+    GET before the replica has caught up. Nothing is keyed on the client
+    address: clients behind one proxy or NAT do not pin each other.
+    """
+    sync_capable = True
+    async_capable = True
+
+    sticky_cookie = 'replica_sticky'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        key = self._client_key(request)
+        safe = request.method in SAFE_METHODS
+        use_replica = safe and not self._has_cookie(request) and not (
+            key and cache.get(key)
+        )
+
+        with replica_reads(use_replica):
+            response = self.get_response(request)
+
+        if not safe and settings.REPLICA_STICKY_SECONDS:
+            for pinned in self._pin(request, response):
+                cache.set(pinned, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return await self.get_response(request)
+
+        key = self._client_key(request)
+        safe = request.method in SAFE_METHODS
+        use_replica = safe and not self._has_cookie(request) and not (
+            key and await cache.aget(key)
+        )
+
+        with replica_reads(use_replica):
+            response = await self.get_response(request)
+
+        if not safe and settings.REPLICA_STICKY_SECONDS:
+            for pinned in self._pin(request, response):
+                await cache.aset(
+                    pinned, True, settings.REPLICA_STICKY_SECONDS
+                )
+        return response
+
+    def _has_cookie(self, request):
+        return self.sticky_cookie in request.COOKIES
+
+    def _pin(self, request, response):
+        """The sticky keys a write pins; anonymous writes get the cookie."""
+        key = self._client_key(request)
+        if key:
+            return [key]
+        response.set_cookie(
+            self.sticky_cookie, '1',
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and data.get('token'):
+            keyword = TokenAuthentication.keyword
+            return [self._key(f'{keyword} {data["token"]}')]
+        return []
+
+    def _client_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            return self._key(authorization)
+        return None
+
+    def _key(self, credential):
+        digest = hashlib.sha1(credential.encode()).hexdigest()
+        return f'replica-sticky:{digest}'
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure wall time and database usage of every request, report them in a
+    Server-Timing header and feed the per-route histograms of core.metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with metrics.collect() as request_metrics, \
+                execute_wrapper(request_metrics):
+            response = self.get_response(request)
+        return self.finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        with metrics.collect() as request_metrics, \
+                execute_wrapper(request_metrics):
+            response = await self.get_response(request)
+        return self.finish(request, response, request_metrics)
+
+    def finish(self, request, response, request_metrics):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unmatched'
+        metrics.record(
+            route, request.method, response.status_code, request_metrics
+        )
+        response['Server-Timing'] = request_metrics.server_timing()
+        return response
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Indexes for the admin's case-insensitive prefix searches ("^field" in
+# search_fields), which PostgreSQL runs as UPPER(field::text) LIKE 'X%'.
+# Other databases do not use these, so they are only created on PostgreSQL.
+#
+# They are built CONCURRENTLY so writes to these tables are not blocked
+# while the migration runs, which cannot happen in a transaction: the
+# migration is not atomic. A failed concurrent build leaves an invalid
+# index behind, which the next run drops and builds again.
+PATTERN_INDEXES = [
+    ('core_user_email_upper_like', 'core_user', 'email'),
+    ('core_recipe_title_upper_like', 'core_recipe', 'title'),
+    ('core_tag_name_upper_like', 'core_tag', 'name'),
+    ('core_ingredient_name_upper_like', 'core_ingredient', 'name'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for name, table, column in PATTERN_INDEXES:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_index JOIN pg_class '
+                'ON pg_class.oid = pg_index.indexrelid '
+                'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+                [name],
+            )
+            invalid = cursor.fetchone() is not None
+        if invalid:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY {quote(name)}')
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} '
+            f'ON {quote(table)} '
+            f'(UPPER({quote(column)}::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in PATTERN_INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS '
+            f'{schema_editor.quote_name(name)}'
+        )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0006_changelog"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
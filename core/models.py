@@ -1,12 +1,15 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from app import settings
+from core.cache import bump_user_version, delete_recipe_details
 import uuid
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 
 def recipe_image_file_path(instance, filename):
@@ -48,6 +51,71 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeManager(models.Manager):
+    def duplicate(self, recipe_id, user_id):
+        """
+        Copy the recipe `recipe_id` of `user_id`, with its tags and
+        ingredients, and return the id of the copy, or None if the user has
+        no such recipe.
+
+        The rows are copied with INSERT ... SELECT statements, so nothing
+        is loaded into Python. The copy shares the image file, which is
+        safe because uploads always get new names and files are never
+        overwritten. No signals are sent, so the owner's cache version,
+        the detail cache and the change log are updated here.
+        """
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        table = quote(opts.db_table)
+        columns = ', '.join(
+            quote(field.column)
+            for field in opts.concrete_fields if not field.primary_key
+        )
+        sql = (
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM {table} '
+            f'WHERE {quote(opts.pk.column)} = %s AND '
+            f'{quote(opts.get_field("user").column)} = %s'
+        )
+        returning = connection.features.can_return_columns_from_insert
+        if returning:
+            sql += f' RETURNING {quote(opts.pk.column)}'
+
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, [recipe_id, user_id])
+            if returning:
+                row = cursor.fetchone()
+                copy_id = row[0] if row else None
+            elif cursor.rowcount:
+                copy_id = connection.ops.last_insert_id(
+                    cursor, opts.db_table, opts.pk.column
+                )
+            else:
+                copy_id = None
+            if copy_id is None:
+                return None
+
+            for field in opts.many_to_many:
+                through = quote(field.remote_field.through._meta.db_table)
+                source = quote(field.m2m_column_name())
+                target = quote(field.m2m_reverse_name())
+                cursor.execute(
+                    f'INSERT INTO {through} ({source}, {target}) '
+                    f'SELECT %s, {target} FROM {through} '
+                    f'WHERE {source} = %s',
+                    [copy_id, recipe_id]
+                )
+
+            ChangeLog.objects.db_manager(using).record(
+                user_id, self.model, [copy_id], ChangeLog.UPSERT
+            )
+        bump_user_version(user_id)
+        delete_recipe_details([copy_id])
+        return copy_id
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -58,6 +126,8 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
 
+    objects = RecipeManager()
+
     def __str__(self):
         return self.title
 
@@ -76,3 +146,146 @@ class Ingredient(models.Model):
 
     def __str__(self):
         return self.name
+
+
+_batch = ContextVar('change_log_batch', default=None)
+
+
+class ChangeLogManager(models.Manager):
+    def record(self, user_id, model, object_ids, action):
+        """
+        Log `action` for every id in `object_ids` of `model`, or add it to
+        the current batch() when there is one.
+        """
+        entries = [
+            (user_id, model._meta.model_name, object_id, action)
+            for object_id in object_ids
+        ]
+        batch = _batch.get()
+        if batch is not None and batch[0] == self._using():
+            batch[1].extend(entries)
+        else:
+            self._write(entries)
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect the entries recorded in the block and write them in one
+        INSERT when it ends, keeping only the latest action per object.
+        Use it inside the transaction.atomic() block making the changes,
+        so the entries commit (or roll back) with them. Nested batches
+        join the outer one. Entries stay in the batch when a savepoint
+        inside the block is rolled back, so only wrap blocks whose
+        rolled-back savepoints saved nothing, as with get_or_create.
+        """
+        if _batch.get() is not None:
+            yield
+            return
+        entries = []
+        token = _batch.set((self._using(), entries))
+        try:
+            yield
+        finally:
+            _batch.reset(token)
+        latest = {}
+        for user_id, model, object_id, action in entries:
+            # Only the latest action per object matters, as in sync.
+            latest.pop((user_id, model, object_id), None)
+            latest[user_id, model, object_id] = action
+        self._write([key + (action,) for key, action in latest.items()])
+
+    def _using(self):
+        return self._db or router.db_for_write(self.model)
+
+    def _write(self, entries):
+        self.bulk_create([
+            self.model(
+                user_id=user_id,
+                model=model,
+                object_id=object_id,
+                action=action,
+            )
+            for user_id, model, object_id, action in entries
+        ])
+
+
+class ChangeLog(models.Model):
+    """
+    Append-only log of changes to a user's recipes, tags and ingredients.
+
+    Written by the handlers in core.signals in the transaction making the
+    change; the id of the latest entry is the sync token handed to clients
+    by the sync endpoint.
+
+    Ids are handed out when an entry is inserted, not when it commits, so
+    a reader can see entry n + 1 before entry n. The sync endpoint
+    therefore does not move its token past entries younger than
+    settings.SYNC_SETTLE_SECONDS; they are sent again on the next call.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTIONS = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=8, choices=ACTIONS)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_change_user_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.model} {self.object_id}'
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work for the worker command, see core.jobs.
+
+    `name` is the registered task to run with `payload` as keyword
+    arguments. Running jobs record the worker and the time they were
+    claimed, so jobs of a crashed worker can be claimed again.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED
+    )
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='core_job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
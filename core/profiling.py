@@ -0,0 +1,153 @@
+"""
+On-demand profiling of single requests.
+
+A staff user adds an `X-Profile: 1` header or a `_profile=1` query
+parameter to a request. ProfilingMiddleware then runs that one request
+under cProfile and records the SQL it executes. The results go to
+settings.PROFILE_ROOT, and the response carries an X-Profile-Id header
+for core.views.ProfileView. Requests without the flag only pay for one
+header lookup and one query parameter lookup. Production settings only
+install the middleware when PROFILING=1.
+
+cProfile only sees the thread it is enabled on. Under ASGI a profiled
+request is therefore handled from a worker thread, which the request's
+sync code (views, serializers) also runs on; code of async views runs on
+the event loop and does not show up in the profile.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.querywatch import watch_queries
+
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def profile_root():
+    return Path(settings.PROFILE_ROOT)
+
+
+def profile_paths(profile_id):
+    """The .prof and .json paths of a profile, or None for a bad id."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    root = profile_root()
+    return root / f'{profile_id}.prof', root / f'{profile_id}.json'
+
+
+def _prune():
+    files = sorted(profile_root().glob('*.json'), key=lambda p: p.stat().st_mtime)
+    for summary in files[:max(0, len(files) - settings.PROFILE_MAX_KEPT)]:
+        summary.unlink(missing_ok=True)
+        summary.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._requested(request):
+            return self.get_response(request)
+
+        user = self._staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return self._profile(request, user, self.get_response)
+
+    async def __acall__(self, request):
+        if not self._requested(request):
+            return await self.get_response(request)
+
+        user = await sync_to_async(self._staff_user)(request)
+        if user is None:
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(
+            request, user, async_to_sync(self.get_response)
+        )
+
+    def _requested(self, request):
+        return bool(
+            request.META.get('HTTP_X_PROFILE') or request.GET.get('_profile')
+        )
+
+    def _staff_user(self, request):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                user_auth = TokenAuthentication().authenticate(request)
+            except exceptions.AuthenticationFailed:
+                return None
+            user = user_auth[0] if user_auth else None
+        if user is not None and user.is_active and user.is_staff:
+            return user
+        return None
+
+    def _profile(self, request, user, get_response):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with watch_queries() as report:
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        profile_id = uuid.uuid4().hex
+        prof_path, summary_path = profile_paths(profile_id)
+        prof_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(prof_path)
+
+        stats_text = io.StringIO()
+        pstats.Stats(profiler, stream=stats_text).sort_stats(
+            'cumulative'
+        ).print_stats(40)
+        summary_path.write_text(json.dumps({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'user': user.email,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'queries': [
+                {
+                    'sql': record.sql,
+                    'params': repr(record.params),
+                    'duration_ms': round(record.duration * 1000, 3),
+                    'origin': record.origin,
+                }
+                for record in report.records
+            ],
+            'stats': stats_text.getvalue(),
+        }, indent=2))
+        _prune()
+
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = request.build_absolute_uri(
+            reverse('profile-detail', args=[profile_id])
+        )
+        return response
@@ -0,0 +1,285 @@
+"""
+N+1 and slow-query detection.
+
+QueryWatcher is a database execute wrapper that records every query with
+the project code that issued it. Its report flags:
+
+- N+1 patterns: the same statement (ignoring parameters and the length of
+  IN lists) executed settings.QUERY_WATCH_REPEAT_THRESHOLD times or more,
+- slow queries: over settings.QUERY_WATCH_SLOW_MS,
+- sequential scans: tables read without an index according to EXPLAIN,
+  when settings.QUERY_WATCH_EXPLAIN is on (it runs extra queries).
+
+QueryWatchMiddleware logs the report of every request when
+settings.QUERY_WATCH is on (test profile, staging) and
+QueryBudgetTestMixin lets tests pin a query budget per endpoint.
+"""
+import logging
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connections
+
+from core.dbwrappers import execute_wrapper
+
+logger = logging.getLogger(__name__)
+
+PROJECT_APPS = ('core', 'recipe', 'user', 'app')
+IGNORED_MODULES = (
+    'core.querywatch', 'core.middleware', 'core.metrics', 'core.dbwrappers'
+)
+
+_IN_LIST = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize(sql):
+    """Reduce a statement to its shape so near-identical queries match."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _is_project_module(module):
+    if not module or module.startswith(IGNORED_MODULES):
+        return False
+    parts = module.split('.')
+    return parts[0] in PROJECT_APPS and 'tests' not in parts
+
+
+def find_origin():
+    """
+    Describe the project code responsible for the current query: the
+    innermost project function on the stack, or the method of the project
+    serializer/view (e.g. a DRF to_representation) that triggered it.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        code = frame.f_code
+        if _is_project_module(module):
+            return f'{module}.{code.co_name} (line {frame.f_lineno})'
+        owner = frame.f_locals.get('self')
+        owner_module = getattr(type(owner), '__module__', '')
+        if owner is not None and _is_project_module(owner_module):
+            return f'{owner_module}.{type(owner).__qualname__}.{code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryRecord:
+    def __init__(self, alias, sql, params, duration, origin):
+        self.alias = alias
+        self.sql = sql
+        self.params = params
+        self.duration = duration
+        self.origin = origin
+
+    def __str__(self):
+        return f'{self.duration * 1000:.1f}ms [{self.origin}] {self.sql}'
+
+
+class QueryIssue:
+    N_PLUS_ONE = 'n+1'
+    SLOW = 'slow'
+    SEQ_SCAN = 'seq-scan'
+
+    def __init__(self, kind, record, detail):
+        self.kind = kind
+        self.record = record
+        self.detail = detail
+
+    def __str__(self):
+        return (
+            f'{self.kind}: {self.detail} from {self.record.origin}: '
+            f'{self.record.sql}'
+        )
+
+
+class QueryWatcher:
+    def __init__(self, alias):
+        self.alias = alias
+        self.records = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if context['connection'].alias != self.alias:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.records.append(QueryRecord(
+                self.alias,
+                sql,
+                params,
+                time.perf_counter() - start,
+                find_origin(),
+            ))
+
+
+class QueryReport:
+    def __init__(self):
+        self.watchers = []
+        self.issues = []
+
+    @property
+    def records(self):
+        return [record for w in self.watchers for record in w.records]
+
+    def analyse(self, repeat_threshold=None, slow_ms=None, explain=None):
+        if repeat_threshold is None:
+            repeat_threshold = settings.QUERY_WATCH_REPEAT_THRESHOLD
+        if slow_ms is None:
+            slow_ms = settings.QUERY_WATCH_SLOW_MS
+        if explain is None:
+            explain = settings.QUERY_WATCH_EXPLAIN
+
+        self.issues = []
+        groups = defaultdict(list)
+        for record in self.records:
+            groups[(record.alias, normalize(record.sql))].append(record)
+            if record.duration * 1000 > slow_ms:
+                self.issues.append(QueryIssue(
+                    QueryIssue.SLOW, record,
+                    f'{record.duration * 1000:.1f}ms > {slow_ms}ms'
+                ))
+
+        for records in groups.values():
+            if len(records) >= repeat_threshold:
+                self.issues.append(QueryIssue(
+                    QueryIssue.N_PLUS_ONE, records[0],
+                    f'executed {len(records)} times'
+                ))
+            if explain and records[0].sql.lstrip().upper().startswith(
+                'SELECT'
+            ):
+                for table in sequential_scans(records[0]):
+                    self.issues.append(QueryIssue(
+                        QueryIssue.SEQ_SCAN, records[0],
+                        f'sequential scan on {table}'
+                    ))
+        return self.issues
+
+    def __str__(self):
+        lines = [f'{len(self.records)} queries']
+        lines.extend(f'  {record}' for record in self.records)
+        lines.extend(f'  ! {issue}' for issue in self.issues)
+        return '\n'.join(lines)
+
+
+def sequential_scans(record):
+    """Tables the planner reads without an index for `record`."""
+    connection = connections[record.alias]
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        prefix, pattern = 'EXPLAIN ', re.compile(r'Seq Scan on (\w+)')
+    elif vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+        pattern = re.compile(r'^SCAN (?:TABLE )?(\w+)(?!.*USING)')
+    else:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + record.sql, record.params)
+        plan = [str(row[-1]) for row in cursor.fetchall()]
+    return [
+        match.group(1)
+        for line in plan
+        for match in [pattern.search(line.strip())]
+        if match
+    ]
+
+
+@contextmanager
+def watch_queries(using=None):
+    """Record queries on `using` (all connections by default)."""
+    report = QueryReport()
+    aliases = using or [connection.alias for connection in connections.all()]
+    with ExitStack() as stack:
+        for alias in aliases:
+            watcher = QueryWatcher(alias)
+            report.watchers.append(watcher)
+            stack.enter_context(execute_wrapper(watcher))
+        yield report
+
+
+class QueryWatchMiddleware:
+    """Log N+1 patterns, slow queries and sequential scans per request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_WATCH:
+            return self.get_response(request)
+
+        with watch_queries() as report:
+            response = self.get_response(request)
+        self.report(request, report)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.QUERY_WATCH:
+            return await self.get_response(request)
+
+        with watch_queries() as report:
+            response = await self.get_response(request)
+        # EXPLAIN runs queries, which must not happen on the event loop.
+        await sync_to_async(self.report)(request, report)
+        return response
+
+    def report(self, request, report):
+        if report.analyse():
+            match = getattr(request, 'resolver_match', None)
+            logger.warning(
+                'Query issues in %s %s (%s):\n%s',
+                request.method,
+                request.path,
+                match.view_name if match else 'unmatched',
+                report,
+            )
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin to pin the queries an endpoint may run:
+
+        with self.assertQueryBudget(3):
+            self.client.get(RECIPES_URL)
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_ms=None, allow_repeats=False):
+        with watch_queries() as report:
+            yield report
+
+        issues = report.analyse(
+            slow_ms=max_ms if max_ms is not None else float('inf'),
+            explain=False,
+        )
+        problems = []
+        if len(report.records) > max_queries:
+            problems.append(
+                f'{len(report.records)} queries exceed budget of {max_queries}'
+            )
+        problems.extend(
+            str(issue) for issue in issues
+            if not allow_repeats or issue.kind != QueryIssue.N_PLUS_ONE
+        )
+        if problems:
+            self.fail('\n'.join(problems + [str(report)]))
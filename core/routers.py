@@ -0,0 +1,47 @@
+"""
+Database routers.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route ORM reads in this context to a replica (or back to primary)."""
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def reading_from_replica():
+    """
+    Whether ORM reads in this context go to a replica, which may lag the
+    primary: data read that way must not be cached as current.
+    """
+    return bool(settings.REPLICA_DATABASES) and _read_from_replica.get()
+
+
+class ReplicaRouter:
+    """
+    Send reads to one of settings.REPLICA_DATABASES while replica reads are
+    enabled for the current request, everything else to "default".
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
@@ -0,0 +1,110 @@
+"""
+Cached OpenAPI schema.
+
+Generating the schema introspects every view and serializer, which is far
+too slow to repeat for each request. CachedSchemaView renders each format
+once per process and then serves the bytes from memory with an ETag, plus
+a gzip copy when settings.SCHEMA_PRECOMPRESS is on.
+
+When settings.SCHEMA_ROOT is set, the files written at deploy time by
+`manage.py build_schema` are loaded instead of generating at all. Either
+way, the cache lasts until the next deploy (process restart).
+"""
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from core.compression import negotiate
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+_entries = {}
+_lock = threading.Lock()
+
+
+class SchemaEntry:
+    def __init__(self, body, gzipped=None):
+        self.body = body
+        self.gzipped = gzipped
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def generate(fmt):
+    """Render the public schema in `fmt` ("yaml" or "json")."""
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return RENDERERS[fmt]().render(schema, renderer_context={})
+
+
+def compress(body):
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def schema_path(fmt):
+    return Path(settings.SCHEMA_ROOT) / f'openapi.{fmt}'
+
+
+def _load(fmt):
+    if settings.SCHEMA_ROOT and schema_path(fmt).exists():
+        path = schema_path(fmt)
+        gz_path = path.with_name(path.name + '.gz')
+        body = path.read_bytes()
+        gzipped = gz_path.read_bytes() if gz_path.exists() else None
+    else:
+        body = generate(fmt)
+        gzipped = None
+    if gzipped is None and settings.SCHEMA_PRECOMPRESS:
+        gzipped = compress(body)
+    return SchemaEntry(body, gzipped)
+
+
+def get_entry(fmt):
+    entry = _entries.get(fmt)
+    if entry is None:
+        with _lock:
+            entry = _entries.get(fmt)
+            if entry is None:
+                entry = _entries[fmt] = _load(fmt)
+    return entry
+
+
+def clear_cache():
+    _entries.clear()
+
+
+def accepts_gzip(request):
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return negotiate(accept_encoding, ['gzip']) == 'gzip'
+
+
+class CachedSchemaView(SpectacularAPIView):
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        entry = get_entry(request.accepted_renderer.format)
+
+        if entry.etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        elif entry.gzipped is not None and accepts_gzip(request):
+            response = HttpResponse(
+                entry.gzipped, content_type=request.accepted_media_type
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                entry.body, content_type=request.accepted_media_type
+            )
+        response['ETag'] = entry.etag
+        response['Cache-Control'] = 'public, max-age=300'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
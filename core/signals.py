@@ -0,0 +1,124 @@
+"""
+Signal handlers keeping per-user caches and the change log coherent with
+writes.
+
+Bulk operations that bypass signals (QuerySet.update(), raw SQL, the seed
+command) must bump the owner's cache version and record their changes
+themselves.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_user_version, delete_recipe_details
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_owner_version(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_owner_version_on_m2m(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_detail(sender, instance, **kwargs):
+    # RecipeDetailSerializer writes the new representation through after
+    # saving, so this only leaves changes made elsewhere uncached.
+    delete_recipe_details([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def delete_tagged_recipe_details(sender, instance, created=False, **kwargs):
+    """Recipes show the names of their tags and ingredients."""
+    if created:
+        return
+    field = 'tags' if sender is Tag else 'ingredients'
+    through = getattr(Recipe, field).through
+    delete_recipe_details(
+        through.objects.filter(**{
+            f'{sender._meta.model_name}_id': instance.pk
+        }).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def delete_recipe_details_on_m2m(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    recipe_ids = _changed_recipe_ids(
+        sender, instance, action, reverse, pk_set
+    )
+    if recipe_ids:
+        delete_recipe_details(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_upsert(sender, instance, **kwargs):
+    ChangeLog.objects.record(
+        instance.user_id, sender, [instance.pk], ChangeLog.UPSERT
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_delete(sender, instance, origin=None, **kwargs):
+    # The log itself goes away with a deleted user.
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(model, get_user_model()):
+        return
+    ChangeLog.objects.record(
+        instance.user_id, sender, [instance.pk], ChangeLog.DELETE
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def log_recipe_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """A recipe whose tags or ingredients change counts as upserted."""
+    recipe_ids = _changed_recipe_ids(
+        sender, instance, action, reverse, pk_set
+    )
+    if recipe_ids:
+        ChangeLog.objects.record(
+            instance.user_id, Recipe, recipe_ids, ChangeLog.UPSERT
+        )
+
+
+def _changed_recipe_ids(sender, instance, action, reverse, pk_set):
+    """Ids of the recipes whose tags or ingredients an m2m change alters."""
+    if not reverse:
+        return [instance.pk] if action.startswith('post_') else []
+
+    # Changed from the tag or ingredient side: pk_set holds recipe ids,
+    # except for clear(), where they are only known beforehand.
+    if action == 'pre_clear':
+        pk_set = sender.objects.filter(**{
+            f'{instance._meta.model_name}_id': instance.pk
+        }).values_list('recipe_id', flat=True)
+    elif action not in ('post_add', 'post_remove'):
+        return []
+    return sorted(pk_set)
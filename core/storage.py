@@ -0,0 +1,120 @@
+"""
+Media storage backends that hand out presigned URLs.
+
+Both backends implement `presigned_upload()` and `presigned_download()`, so
+clients move image bytes straight to and from the store and the API only
+deals in object names:
+
+- S3MediaStorage targets any S3-compatible object store through
+  django-storages and boto3 (optional dependencies). Uploads are presigned
+  POST policies limiting size and content type; downloads are presigned
+  GET URLs.
+- LocalMediaStorage keeps files under MEDIA_ROOT and emulates the object
+  store for development and tests: its URLs point at
+  core.views.LocalStorageView and carry an HMAC signature and expiry in the
+  query string, like presigned S3 URLs.
+
+MEDIA_STORAGE selects the backend used as DEFAULT_FILE_STORAGE.
+"""
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage, Storage
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+try:
+    from storages.backends.s3boto3 import S3Boto3Storage
+except ImportError:
+    S3Boto3Storage = None
+
+IMAGE_CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+}
+
+
+class S3MediaStorage(S3Boto3Storage or Storage):
+
+    def __init__(self, **kwargs):
+        if S3Boto3Storage is None:
+            raise ImproperlyConfigured(
+                'MEDIA_STORAGE = "s3" requires django-storages and boto3.'
+            )
+        super().__init__(**kwargs)
+
+    def presigned_upload(self, name, content_type, max_size, expires):
+        post = self.connection.meta.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=self._normalize_name(name),
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expires,
+        )
+        return {
+            'method': 'POST',
+            'url': post['url'],
+            'fields': post['fields'],
+            'headers': {},
+        }
+
+    def presigned_download(self, name, expires):
+        return self.url(name, expire=expires)
+
+
+class LocalMediaStorage(FileSystemStorage):
+
+    def signature(self, method, name, expires, content_type='', max_size=''):
+        return salted_hmac(
+            'core.storage.LocalMediaStorage',
+            f'{method}\n{name}\n{expires}\n{content_type}\n{max_size}',
+        ).hexdigest()
+
+    def verify(self, method, name, params, content_type='', max_size=''):
+        """Whether `params` hold a valid, unexpired signature for `name`."""
+        try:
+            expires = int(params.get('expires', ''))
+        except ValueError:
+            return False
+        if expires < time.time():
+            return False
+        return constant_time_compare(
+            params.get('signature', ''),
+            self.signature(method, name, expires, content_type, max_size),
+        )
+
+    def signed_url(self, method, name, expires, **signed):
+        # Round the expiry up to a multiple of `expires`, so URLs are
+        # stable (and cacheable) for a while and valid for at least
+        # `expires` seconds.
+        expires_at = (int(time.time()) // expires + 2) * expires
+        query = {
+            **signed,
+            'expires': expires_at,
+            'signature': self.signature(method, name, expires_at, **signed),
+        }
+        path = reverse('local-storage', args=[name])
+        return f'{path}?{urlencode(query)}'
+
+    def url(self, name):
+        return self.presigned_download(name, settings.MEDIA_URL_EXPIRE)
+
+    def presigned_upload(self, name, content_type, max_size, expires):
+        return {
+            'method': 'PUT',
+            'url': self.signed_url(
+                'PUT', name, expires,
+                content_type=content_type, max_size=max_size,
+            ),
+            'fields': {},
+            'headers': {'Content-Type': content_type},
+        }
+
+    def presigned_download(self, name, expires):
+        return self.signed_url('GET', name, expires)
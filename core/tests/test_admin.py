@@ -1,13 +1,17 @@
-from django import setup
-from django.test import TransactionTestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client
 from django.urls import reverse
+from decimal import Decimal
+from unittest import mock
 
-setup()
+from core.admin import EstimatedCountPaginator
+from core.models import Recipe, Tag
+from core.querywatch import QueryBudgetTestMixin
 
 
-class AdminSiteTests(TransactionTestCase):
+class AdminSiteTests(QueryBudgetTestMixin, TestCase):
     def setUp(self) -> None:
         self.client = Client()
         self.admin_user = get_user_model().objects.create_superuser(
@@ -39,3 +43,67 @@ class AdminSiteTests(TransactionTestCase):
         res = self.client.get(url)
 
         self.assertEqual(200, res.status_code)
+
+    def test_recipe_changelist_should_not_query_per_row(self):
+        for i in range(10):
+            user = get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='test123'
+            )
+            Recipe.objects.create(
+                user=user, title=f'Recipe {i}', time_minutes=5,
+                price=Decimal('1.00')
+            )
+        url = reverse('admin:core_recipe_changelist')
+
+        # Session, admin user, count and the recipes joined with users.
+        with self.assertQueryBudget(4):
+            res = self.client.get(url)
+
+        self.assertContains(res, 'user9@example.com')
+
+    def test_tag_changelist_search_should_match_prefix(self):
+        Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=self.user, name='Quick dinner')
+        url = reverse('admin:core_tag_changelist')
+
+        res = self.client.get(url, {'q': 'din'})
+
+        self.assertContains(res, '>Dinner<')
+        self.assertNotContains(res, 'Quick dinner')
+
+    def test_recipe_add_should_not_list_all_users(self):
+        url = reverse('admin:core_recipe_add')
+        res = self.client.get(url)
+
+        self.assertEqual(200, res.status_code)
+        self.assertNotContains(res, self.user.email)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self) -> None:
+        self.queryset = get_user_model().objects.order_by('id')
+
+    def test_count_should_be_exact_off_postgresql(self):
+        get_user_model().objects.create_user(email='a@example.com')
+
+        self.assertEqual(1, EstimatedCountPaginator(self.queryset, 10).count)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1000)
+    def test_large_estimate_should_replace_count_on_postgresql(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(
+                    EstimatedCountPaginator, 'estimate', return_value=5000
+                ):
+            paginator = EstimatedCountPaginator(self.queryset, 10)
+
+            self.assertEqual(5000, paginator.count)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=1000)
+    def test_small_estimate_should_fall_back_to_count(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(
+                    EstimatedCountPaginator, 'estimate', return_value=10
+                ):
+            paginator = EstimatedCountPaginator(self.queryset, 10)
+
+            self.assertEqual(0, paginator.count)
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from io import StringIO
+
+from core.models import Recipe, Tag, Ingredient
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, **options):
+        call_command('seed', stdout=StringIO(), **options)
+
+    def test_seed_should_create_requested_rows(self):
+        self.seed(users=2, recipes=5, tags=3, ingredients=4)
+
+        self.assertEqual(2, get_user_model().objects.count())
+        self.assertEqual(10, Recipe.objects.count())
+        self.assertEqual(6, Tag.objects.count())
+        self.assertEqual(8, Ingredient.objects.count())
+
+    def test_seed_should_link_recipes_to_their_users_tags(self):
+        self.seed(users=2, recipes=5)
+
+        for recipe in Recipe.objects.prefetch_related('tags', 'ingredients'):
+            self.assertTrue(recipe.ingredients.exists())
+            for tag in recipe.tags.all():
+                self.assertEqual(recipe.user_id, tag.user_id)
+
+    def test_seeded_users_should_log_in_with_password(self):
+        self.seed(users=1, recipes=1, password='secret123')
+
+        user = get_user_model().objects.get(email='user0@example.com')
+        self.assertTrue(user.check_password('secret123'))
+
+    def test_seed_should_be_deterministic_for_a_seed(self):
+        def titles():
+            return list(
+                Recipe.objects.order_by('id').values_list('title', 'price')
+            )
+
+        self.seed(users=2, recipes=10, seed=7)
+        first = titles()
+        get_user_model().objects.all().delete()
+        self.seed(users=2, recipes=10, seed=7)
+
+        self.assertEqual(first, titles())
+
+    def test_seed_should_reuse_one_password_hash(self):
+        self.seed(users=3, recipes=1)
+
+        hashes = set(get_user_model().objects.values_list('password', flat=True))
+        self.assertEqual(1, len(hashes))
@@ -0,0 +1,111 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+import gzip
+import json
+
+from core.compression import negotiate
+from core.models import Recipe, Tag
+from decimal import Decimal
+
+RECIPES_URL = reverse('recipe-list')
+TAGS_URL = reverse('tag-list')
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_gzip_should_be_chosen_when_accepted(self):
+        self.assertEqual('gzip', negotiate('gzip, deflate'))
+
+    def test_zero_quality_should_be_refused(self):
+        self.assertIsNone(negotiate('gzip;q=0, identity'))
+
+    def test_wildcard_should_accept_any_encoding(self):
+        self.assertIsNotNone(negotiate('*'))
+
+    def test_unknown_encodings_should_be_ignored(self):
+        self.assertIsNone(negotiate('compress, deflate'))
+        self.assertIsNone(negotiate(''))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200, RESPONSE_CACHE_TIMEOUT=300)
+class CompressedCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.00')
+            )
+            recipe.tags.add(tag)
+
+    def get(self, url, encoding='gzip'):
+        return self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_large_response_should_be_gzipped(self):
+        res = self.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual('gzip', res['Content-Encoding'])
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(10, len(json.loads(gzip.decompress(res.content))))
+
+    def test_response_without_accept_encoding_should_not_be_compressed(self):
+        res = self.get(RECIPES_URL, encoding='')
+
+        self.assertNotIn('Content-Encoding', res)
+        self.assertEqual(10, len(res.json()))
+
+    def test_small_response_should_not_be_compressed(self):
+        res = self.get(TAGS_URL)
+
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_cached_list_should_be_served_compressed_without_queries(self):
+        first = self.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.get(RECIPES_URL)
+
+        self.assertEqual('gzip', second['Content-Encoding'])
+        self.assertEqual('application/json', second['Content-Type'])
+        self.assertEqual(
+            gzip.decompress(first.content),
+            gzip.decompress(second.content)
+        )
+
+    def test_write_should_invalidate_cached_list(self):
+        self.get(RECIPES_URL)
+        Recipe.objects.create(
+            user=self.user,
+            title='New recipe',
+            time_minutes=10,
+            price=Decimal('5.00')
+        )
+
+        res = self.get(RECIPES_URL)
+
+        self.assertEqual(11, len(json.loads(gzip.decompress(res.content))))
+
+    def test_cached_list_should_be_per_user(self):
+        self.get(RECIPES_URL)
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123'
+        )
+        self.client.force_authenticate(user=other_user)
+
+        res = self.get(RECIPES_URL, encoding='')
+
+        self.assertEqual([], res.json())
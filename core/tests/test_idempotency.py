@@ -0,0 +1,137 @@
+"""
+Tests for Idempotency-Key handling.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe-list')
+CREATE_USER_URL = reverse('user-list')
+
+
+def recipe_payload(**params):
+    return {
+        'title': 'Soup',
+        'time_minutes': 10,
+        'price': Decimal('2.50'),
+        **params,
+    }
+
+
+class IdempotencyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, payload, key='key-1', url=RECIPES_URL):
+        return self.client.post(
+            url, payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_should_replay_the_stored_response(self):
+        first = self.post(recipe_payload())
+        retry = self.post(recipe_payload())
+
+        self.assertEqual(status.HTTP_201_CREATED, retry.status_code)
+        self.assertEqual(first.data, retry.data)
+        self.assertEqual('true', retry['Idempotent-Replayed'])
+        self.assertEqual(1, Recipe.objects.count())
+
+    def test_requests_without_a_key_should_not_be_deduplicated(self):
+        self.client.post(RECIPES_URL, recipe_payload(), format='json')
+        self.client.post(RECIPES_URL, recipe_payload(), format='json')
+
+        self.assertEqual(2, Recipe.objects.count())
+
+    def test_keys_should_be_scoped_to_the_user(self):
+        self.post(recipe_payload())
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        self.client.force_authenticate(user=other)
+
+        res = self.post(recipe_payload())
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(2, Recipe.objects.count())
+
+    def test_key_reused_for_another_request_should_return_422(self):
+        self.post(recipe_payload())
+
+        res = self.post(recipe_payload(title='Stew'))
+
+        self.assertEqual(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, res.status_code
+        )
+        self.assertEqual(1, Recipe.objects.count())
+
+    def test_retry_racing_the_first_request_should_return_409(self):
+        retries = []
+        perform_create = RecipeViewSet.perform_create
+
+        def perform_create_during_retry(view, serializer):
+            retries.append(self.post(recipe_payload()))
+            perform_create(view, serializer)
+
+        with patch.object(
+            RecipeViewSet, 'perform_create', perform_create_during_retry
+        ):
+            first = self.post(recipe_payload())
+
+        self.assertEqual(status.HTTP_201_CREATED, first.status_code)
+        self.assertEqual(status.HTTP_409_CONFLICT, retries[0].status_code)
+        self.assertEqual('1', retries[0]['Retry-After'])
+        self.assertEqual(1, Recipe.objects.count())
+
+    def test_failed_request_should_release_its_key(self):
+        res = self.post({'title': 'Soup'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+        res = self.post(recipe_payload())
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+    def test_user_signup_should_be_idempotent(self):
+        self.client.force_authenticate(user=None)
+        payload = {
+            'email': 'new@example.com',
+            'password': 'test123',
+            'name': 'New',
+        }
+
+        first = self.post(payload, url=CREATE_USER_URL)
+        retry = self.post(payload, url=CREATE_USER_URL)
+
+        self.assertEqual(status.HTTP_201_CREATED, first.status_code)
+        self.assertEqual(first.data, retry.data)
+        self.assertEqual('true', retry['Idempotent-Replayed'])
+
+    def test_anonymous_keys_should_be_scoped_to_the_client(self):
+        self.client.force_authenticate(user=None)
+        payload = {
+            'email': 'new@example.com',
+            'password': 'test123',
+            'name': 'New',
+        }
+        self.post(payload, url=CREATE_USER_URL)
+
+        res = self.client.post(
+            CREATE_USER_URL, payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1', REMOTE_ADDR='203.0.113.7',
+        )
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
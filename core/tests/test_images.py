@@ -0,0 +1,98 @@
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+from PIL import Image
+from unittest import mock
+import io
+import os
+import threading
+import time
+
+from core import images
+from core.tests.utils import use_temp_media_root
+
+
+class ImageVariantTests(SimpleTestCase):
+
+    def setUp(self) -> None:
+        media_root = use_temp_media_root(self)
+        self.storage = FileSystemStorage(location=media_root)
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(buffer, format='PNG')
+        self.storage.save('uploads/a.png', buffer)
+
+    def path(self, name):
+        return os.path.join(self.storage.location, name)
+
+    def test_variant_should_fit_within_size(self):
+        name = images.get_variant(
+            self.storage, 'uploads/a.png', 100, 100, 'webp'
+        )
+
+        with Image.open(self.path(name)) as variant:
+            self.assertEqual('WEBP', variant.format)
+            self.assertEqual((100, 50), variant.size)
+
+    def test_cached_variant_should_not_be_rendered_again(self):
+        images.get_variant(self.storage, 'uploads/a.png', 100, 100, 'jpg')
+
+        with mock.patch('core.images.render') as render:
+            images.get_variant(self.storage, 'uploads/a.png', 100, 100, 'jpg')
+
+        render.assert_not_called()
+
+    def test_render_should_not_leave_lock_files(self):
+        name = images.get_variant(
+            self.storage, 'uploads/a.png', 100, 100, 'jpg'
+        )
+
+        directory = os.path.dirname(self.path(name))
+        self.assertEqual([os.path.basename(name)], os.listdir(directory))
+
+    def test_concurrent_requests_should_render_once(self):
+        real_render = images.render
+        calls = []
+
+        def slow_render(*args):
+            calls.append(args)
+            time.sleep(0.05)
+            real_render(*args)
+
+        with mock.patch('core.images.render', side_effect=slow_render):
+            threads = [
+                threading.Thread(
+                    target=images.get_variant,
+                    args=(self.storage, 'uploads/a.png', 100, 100, 'webp')
+                )
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(1, len(calls))
+
+    def test_renders_below_the_limit_should_not_walk_the_cache(self):
+        images.get_variant(self.storage, 'uploads/a.png', 100, 100, 'jpg')
+
+        with mock.patch('core.images.os.walk') as walk:
+            images.get_variant(
+                self.storage, 'uploads/a.png', 120, 120, 'jpg'
+            )
+
+        walk.assert_not_called()
+
+    def test_least_recently_used_variants_should_be_evicted(self):
+        old = images.get_variant(
+            self.storage, 'uploads/a.png', 100, 100, 'jpg'
+        )
+        os.utime(self.path(old), (0, 0))
+        size = os.path.getsize(self.path(old))
+
+        with self.settings(IMAGE_VARIANT_CACHE_SIZE=size * 1.5):
+            new = images.get_variant(
+                self.storage, 'uploads/a.png', 120, 120, 'jpg'
+            )
+
+        self.assertFalse(os.path.exists(self.path(old)))
+        self.assertTrue(os.path.exists(self.path(new)))
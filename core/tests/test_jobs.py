@@ -0,0 +1,239 @@
+"""
+Tests for the background job queue.
+"""
+import io
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from core import images, jobs
+from core.metrics import render_prometheus
+from core.models import Job, Recipe
+from core.tests.utils import use_temp_media_root
+from recipe.jobs import render_image_variants
+
+calls = []
+
+
+@jobs.task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+@jobs.task(name='tests.limited', concurrency=1)
+def limited():
+    pass
+
+
+def run_jobs():
+    jobs.Worker(concurrency=1).run(burst=True)
+
+
+class JobTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_should_run_queued_jobs(self):
+        job = record.enqueue(value='a')
+
+        run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(['a'], calls)
+        self.assertEqual(Job.SUCCEEDED, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_worker_should_not_run_jobs_before_run_at(self):
+        record.enqueue(
+            value='a', run_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        run_jobs()
+
+        self.assertEqual([], calls)
+
+    def test_failing_job_should_be_retried_with_backoff(self):
+        job = fail.enqueue()
+
+        run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(Job.QUEUED, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(Job.FAILED, job.status)
+        self.assertEqual(2, job.attempts)
+
+    @override_settings(JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=60)
+    def test_backoff_should_grow_exponentially_up_to_the_maximum(self):
+        self.assertTrue(5 <= jobs.backoff(1) <= 10)
+        self.assertTrue(20 <= jobs.backoff(3) <= 40)
+        self.assertTrue(30 <= jobs.backoff(10) <= 60)
+
+    def test_unknown_task_should_fail_without_retry(self):
+        job = Job.objects.create(
+            name='tests.missing', run_at=timezone.now(), max_attempts=3
+        )
+
+        run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(Job.FAILED, job.status)
+        self.assertIn('tests.missing', job.last_error)
+
+    def test_claimed_job_should_not_be_claimed_again(self):
+        record.enqueue(value='a')
+
+        self.assertEqual(1, len(jobs.claim('worker-1', 10)))
+        self.assertEqual([], jobs.claim('worker-2', 10))
+
+    def test_job_of_a_crashed_worker_should_be_claimed_again(self):
+        job = record.enqueue(value='a')
+        jobs.claim('crashed', 1)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        claimed = jobs.claim('worker', 1)
+
+        self.assertEqual([job.pk], [claimed_job.pk for claimed_job in claimed])
+        self.assertEqual(2, claimed[0].attempts)
+
+        # The first worker finishing late must not release the new claim.
+        jobs.execute(job, 'crashed')
+        job.refresh_from_db()
+        self.assertEqual(Job.RUNNING, job.status)
+        self.assertEqual('worker', job.locked_by)
+
+    def test_claim_should_respect_task_concurrency(self):
+        limited.enqueue()
+        limited.enqueue()
+        record.enqueue(value='a')
+
+        claimed = jobs.claim('worker', 10)
+
+        self.assertEqual(
+            ['tests.limited', 'tests.record'],
+            [job.name for job in claimed]
+        )
+        self.assertEqual([], jobs.claim('worker', 10))
+
+    def test_saturated_task_should_not_hold_back_other_jobs(self):
+        for _ in range(3):
+            limited.enqueue()
+        record.enqueue(value='a')
+
+        claimed = jobs.claim('worker', 2)
+
+        self.assertEqual(
+            ['tests.limited', 'tests.record'],
+            [job.name for job in claimed]
+        )
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_should_run_when_queued(self):
+        job = record.enqueue(value='a')
+
+        job.refresh_from_db()
+        self.assertEqual(['a'], calls)
+        self.assertEqual(Job.SUCCEEDED, job.status)
+
+    def test_prune_should_delete_old_succeeded_jobs(self):
+        old = record.enqueue(value='a')
+        failed = fail.enqueue()
+        Job.objects.filter(pk__in=[old.pk, failed.pk]).update(
+            finished_at=timezone.now() - timedelta(days=2)
+        )
+        Job.objects.filter(pk=old.pk).update(status=Job.SUCCEEDED)
+        Job.objects.filter(pk=failed.pk).update(status=Job.FAILED)
+        recent = record.enqueue(value='b')
+        run_jobs()
+
+        jobs.prune()
+
+        self.assertEqual(
+            {failed.pk, recent.pk},
+            set(Job.objects.values_list('pk', flat=True))
+        )
+
+    def test_metrics_should_report_jobs_by_task_and_status(self):
+        record.enqueue(value='a')
+        fail.enqueue(run_at=timezone.now() + timedelta(minutes=1))
+        run_jobs()
+
+        body = render_prometheus()
+
+        self.assertIn('jobs{task="tests.fail",status="queued"} 1', body)
+        self.assertIn(
+            'jobs_total{task="tests.record",outcome="succeeded"}', body
+        )
+
+    def test_run_jobs_command_should_run_until_queue_is_empty(self):
+        record.enqueue(value='a')
+        record.enqueue(value='b')
+
+        call_command(
+            'run_jobs', '--burst', '--concurrency=1', stdout=io.StringIO()
+        )
+
+        self.assertEqual(['a', 'b'], calls)
+
+
+class RenderImageVariantsJobTests(TestCase):
+
+    def setUp(self):
+        use_temp_media_root(self, IMAGE_VARIANT_SIZES=['160x160'])
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123'
+        )
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(buffer, format='PNG')
+        self.recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=1
+        )
+        self.recipe.image.save('a.png', ContentFile(buffer.getvalue()))
+
+    def test_job_should_render_every_variant(self):
+        render_image_variants.enqueue(
+            recipe_id=self.recipe.pk, name=self.recipe.image.name
+        )
+
+        run_jobs()
+
+        for fmt in images.FORMATS:
+            name = images.variant_name(
+                self.recipe.image.name, 160, 160, fmt
+            )
+            self.assertTrue(
+                os.path.exists(self.recipe.image.storage.path(name))
+            )
+
+    def test_job_for_a_replaced_image_should_do_nothing(self):
+        render_image_variants.enqueue(
+            recipe_id=self.recipe.pk, name='uploads/recipe/old.png'
+        )
+
+        run_jobs()
+
+        self.assertFalse(os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, settings.IMAGE_VARIANT_DIR)
+        ))
+        self.assertEqual(Job.SUCCEEDED, Job.objects.get().status)
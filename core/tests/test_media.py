@@ -0,0 +1,76 @@
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.media import serve
+from core.tests.utils import use_temp_media_root
+
+
+@override_settings(MEDIA_SENDFILE='')
+class ServeTests(SimpleTestCase):
+
+    def setUp(self) -> None:
+        media_root = use_temp_media_root(self)
+        self.storage = FileSystemStorage(location=media_root)
+        self.storage.save('uploads/a.png', ContentFile(b'0123456789'))
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        request = self.factory.get('/', **headers)
+        return serve(request, self.storage, 'uploads/a.png')
+
+    def test_file_should_be_streamed_with_validators(self):
+        res = self.serve()
+
+        self.assertEqual(200, res.status_code)
+        self.assertEqual('image/png', res['Content-Type'])
+        self.assertEqual('bytes', res['Accept-Ranges'])
+        self.assertIn('ETag', res)
+        self.assertEqual(b'0123456789', b''.join(res.streaming_content))
+
+    def test_matching_etag_should_return_304(self):
+        etag = self.serve()['ETag']
+
+        res = self.serve(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(304, res.status_code)
+
+    def test_byte_range_should_return_206(self):
+        res = self.serve(HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(206, res.status_code)
+        self.assertEqual('bytes 2-5/10', res['Content-Range'])
+        self.assertEqual(b'2345', b''.join(res.streaming_content))
+
+    def test_suffix_range_should_return_the_tail(self):
+        res = self.serve(HTTP_RANGE='bytes=-3')
+
+        self.assertEqual(b'789', b''.join(res.streaming_content))
+
+    def test_unsatisfiable_range_should_return_416(self):
+        res = self.serve(HTTP_RANGE='bytes=20-')
+
+        self.assertEqual(416, res.status_code)
+        self.assertEqual('bytes */10', res['Content-Range'])
+
+    def test_range_with_stale_if_range_should_return_whole_file(self):
+        res = self.serve(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(200, res.status_code)
+
+    @override_settings(
+        MEDIA_SENDFILE='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected/'
+    )
+    def test_nginx_should_get_accel_redirect(self):
+        res = self.serve()
+
+        self.assertEqual('/protected/uploads/a.png', res['X-Accel-Redirect'])
+        self.assertEqual(b'', res.content)
+
+    @override_settings(MEDIA_SENDFILE='apache')
+    def test_apache_should_get_sendfile_path(self):
+        res = self.serve()
+
+        self.assertEqual(
+            self.storage.path('uploads/a.png'), res['X-Sendfile']
+        )
@@ -0,0 +1,108 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+from decimal import Decimal
+
+RECIPES_URL = reverse('recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_response_should_have_server_timing_header(self):
+        Recipe.objects.create(
+            user=self.user,
+            title='Test title',
+            time_minutes=22,
+            price=Decimal('5.25')
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        timing = res['Server-Timing']
+        for name in ('total;dur=', 'db;dur=', 'serialize;dur=', 'render;dur='):
+            self.assertIn(name, timing)
+        self.assertIn('desc="', timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_async_request_should_count_queries_of_sync_code(self):
+        token = Token.objects.create(user=self.user)
+
+        async def request():
+            return await AsyncClient().get(
+                RECIPES_URL, authorization=f'Token {token.key}'
+            )
+
+        res = async_to_sync(request)()
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        # Authentication and the list run in sync_to_async threads.
+        self.assertNotIn('desc="0 queries"', res['Server-Timing'])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_should_expose_route_histograms(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        )
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        body = res.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_bucket'
+            '{route="recipe-list",method="GET",le="+Inf"}',
+            body
+        )
+        self.assertIn(
+            'http_requests_total{route="recipe-list",method="GET",status="200"}',
+            body
+        )
+
+    def test_metrics_from_other_address_should_return_403(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.7')
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    def test_metrics_from_loopback_should_return_403_by_default(self):
+        # A reverse proxy on the same host connects from loopback.
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_metrics_from_allowed_network_should_return_200(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_with_token_should_return_200(self):
+        res = self.client.get(
+            METRICS_URL,
+            REMOTE_ADDR='203.0.113.7',
+            HTTP_AUTHORIZATION='Bearer secret',
+        )
+        wrong = self.client.get(
+            METRICS_URL,
+            REMOTE_ADDR='203.0.113.7',
+            HTTP_AUTHORIZATION='Bearer guess',
+        )
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, wrong.status_code)
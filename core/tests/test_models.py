@@ -1,9 +1,6 @@
-from django import setup
-from django.test import TransactionTestCase
+from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-setup()
-
 from core import models
 from decimal import Decimal
 from unittest.mock import patch
@@ -16,7 +13,7 @@ def create_user(email='user@example.com', password='test123'):
     )
 
 
-class ModelTests(TransactionTestCase):
+class ModelTests(TestCase):
     def test_create_user_with_email_should_succeed(self):
         email = 'test@example.com'
         password = '123456'
@@ -0,0 +1,102 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+import tempfile
+
+RECIPES_URL = reverse('recipe-list')
+
+
+def profile_url(profile_id):
+    return reverse('profile-detail', args=[profile_id])
+
+
+@override_settings(PROFILE_ROOT=tempfile.mkdtemp())
+class ProfilingTests(TestCase):
+    def setUp(self) -> None:
+        self.staff = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='test123'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123'
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_request_without_flag_should_not_be_profiled(self):
+        self.authenticate(self.staff)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertNotIn('X-Profile-Id', res)
+
+    def test_flag_from_non_staff_user_should_be_ignored(self):
+        self.authenticate(self.user)
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertNotIn('X-Profile-Id', res)
+
+    def test_flag_from_staff_user_should_store_profile(self):
+        self.authenticate(self.staff)
+
+        res = self.client.get(RECIPES_URL, {'_profile': 1})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        profile_id = res['X-Profile-Id']
+
+        res = self.client.get(profile_url(profile_id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(RECIPES_URL + '?_profile=1', res.data['path'])
+        self.assertTrue(res.data['queries'])
+        self.assertIn('cumulative', res.data['stats'])
+
+        res = self.client.get(profile_url(profile_id), {'download': 1})
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertTrue(b''.join(res.streaming_content))
+
+    def test_async_request_should_profile_its_sync_code(self):
+        token = Token.objects.create(user=self.staff)
+
+        async def request():
+            return await AsyncClient().get(
+                RECIPES_URL,
+                authorization=f'Token {token.key}',
+                x_profile='1',
+            )
+
+        profile_id = async_to_sync(request)()['X-Profile-Id']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(profile_url(profile_id))
+        self.assertTrue(res.data['queries'])
+        self.assertIn('(dispatch)', res.data['stats'])
+
+    def test_profile_should_be_restricted_to_staff(self):
+        self.authenticate(self.staff)
+        profile_id = self.client.get(
+            RECIPES_URL, HTTP_X_PROFILE='1'
+        )['X-Profile-Id']
+
+        self.authenticate(self.user)
+        res = self.client.get(profile_url(profile_id))
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    def test_unknown_profile_should_return_404(self):
+        self.authenticate(self.staff)
+
+        res = self.client.get(profile_url('..%2F..%2Fetc%2Fpasswd'))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
@@ -0,0 +1,88 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.querywatch import (
+    QueryBudgetTestMixin,
+    QueryIssue,
+    normalize,
+    watch_queries,
+)
+from decimal import Decimal
+
+
+def load_tag_names(recipes):
+    return [[tag.name for tag in recipe.tags.all()] for recipe in recipes]
+
+
+class QueryWatchTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='test123'
+        )
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'R{i}',
+                time_minutes=5,
+                price=Decimal('1.00')
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+    def test_normalize_should_ignore_literals_and_in_list_length(self):
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (%s, %s) AND n = 5'),
+            normalize('SELECT * FROM t WHERE id IN (%s) AND n = 7'),
+        )
+
+    def test_repeated_queries_should_be_reported_as_n_plus_one(self):
+        with watch_queries() as report:
+            load_tag_names(Recipe.objects.all())
+
+        issues = report.analyse(repeat_threshold=5, explain=False)
+
+        self.assertEqual([QueryIssue.N_PLUS_ONE], [i.kind for i in issues])
+        self.assertIn('executed 5 times', issues[0].detail)
+
+    def test_prefetched_queries_should_not_be_reported(self):
+        with watch_queries() as report:
+            load_tag_names(Recipe.objects.prefetch_related('tags'))
+
+        self.assertEqual([], report.analyse(repeat_threshold=5, explain=False))
+
+    def test_slow_queries_should_be_reported(self):
+        with watch_queries() as report:
+            list(Recipe.objects.all())
+
+        issues = report.analyse(slow_ms=-1, explain=False)
+
+        self.assertEqual([QueryIssue.SLOW], [i.kind for i in issues])
+
+    @override_settings(QUERY_WATCH_EXPLAIN=True)
+    def test_unindexed_filter_should_be_reported_as_seq_scan(self):
+        with watch_queries() as report:
+            list(Recipe.objects.filter(title='R1'))
+
+        issues = report.analyse(slow_ms=float('inf'))
+
+        self.assertIn(QueryIssue.SEQ_SCAN, [i.kind for i in issues])
+
+    def test_origin_should_name_viewset_method(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with watch_queries() as report:
+            client.get(reverse('recipe-list'))
+
+        self.assertEqual(
+            'recipe.views.RecipeViewSet.list',
+            report.records[0].origin
+        )
+
+    def test_query_budget_should_fail_when_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                load_tag_names(Recipe.objects.prefetch_related('tags'))
@@ -0,0 +1,177 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe
+from core.routers import ReplicaRouter, replica_reads
+from decimal import Decimal
+
+RECIPES_URL = reverse('recipe-list')
+FACETS_URL = reverse('recipe-facets')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user_id, using='default', **params):
+    defaults = {
+        'title': 'Test title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.using(using).create(user_id=user_id, **defaults)
+
+
+@override_settings(REPLICA_DATABASES=['sqlite3'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRouterTests(TestCase):
+    databases = {'default', 'sqlite3'}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='test123'
+        )
+        # The "replica" is a separate database, so mirror the user by hand.
+        get_user_model()(
+            id=self.user.id,
+            email=self.user.email,
+            password=self.user.password
+        ).save(using='sqlite3')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_router_outside_request_should_read_from_default(self):
+        self.assertEqual('default', ReplicaRouter().db_for_read(Recipe))
+
+    def test_router_with_replica_reads_should_read_from_replica(self):
+        with replica_reads():
+            self.assertEqual('sqlite3', ReplicaRouter().db_for_read(Recipe))
+        self.assertEqual('default', ReplicaRouter().db_for_write(Recipe))
+
+    def test_get_should_read_from_replica(self):
+        create_recipe(self.user.id, title='Primary')
+        create_recipe(self.user.id, using='sqlite3', title='Replica')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(['Replica'], [r['title'] for r in res.data])
+
+    def test_get_after_write_should_read_from_default(self):
+        create_recipe(self.user.id, using='sqlite3', title='Replica')
+        payload = {
+            'title': 'Primary',
+            'time_minutes': 22,
+            'price': Decimal('5.25'),
+        }
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(['Primary'], [r['title'] for r in res.data])
+
+    def test_get_after_sticky_window_should_read_from_replica(self):
+        create_recipe(self.user.id, using='sqlite3', title='Replica')
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.client.post(RECIPES_URL, {
+                'title': 'Primary',
+                'time_minutes': 22,
+                'price': Decimal('5.25'),
+            })
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(['Replica'], [r['title'] for r in res.data])
+
+    def test_reads_from_replica_should_not_be_cached(self):
+        create_recipe(self.user.id, using='sqlite3', title='Replica')
+        self.client.get(RECIPES_URL)
+        self.client.get(FACETS_URL)
+
+        # A lagging replica's data must not be served once reads are
+        # back on the primary (or on an up to date replica).
+        with override_settings(REPLICA_DATABASES=[]):
+            recipes = self.client.get(RECIPES_URL)
+            facets = self.client.get(FACETS_URL)
+
+        self.assertEqual([], recipes.data)
+        self.assertEqual(0, facets.data['count'])
+
+    def test_details_from_replica_should_not_be_cached(self):
+        recipe = create_recipe(self.user.id, title='Primary')
+        create_recipe(
+            self.user.id, using='sqlite3', id=recipe.id, title='Replica'
+        )
+        self.client.get(detail_url(recipe.id))
+
+        with override_settings(REPLICA_DATABASES=[]):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual('Primary', res.data['title'])
+
+    def token_client(self, user):
+        """A client sending a token that both databases know."""
+        token = Token.objects.create(user=user)
+        Token(key=token.key, user_id=user.id).save(using='sqlite3')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def test_write_with_token_should_not_pin_others_at_same_address(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        get_user_model()(
+            id=other.id, email=other.email, password=other.password
+        ).save(using='sqlite3')
+        create_recipe(other.id, using='sqlite3', title='Replica')
+        writer = self.token_client(self.user)
+        reader = self.token_client(other)
+
+        res = writer.post(RECIPES_URL, {
+            'title': 'Primary', 'time_minutes': 22, 'price': '5.25',
+        })
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+        self.assertEqual(
+            ['Primary'], [r['title'] for r in writer.get(RECIPES_URL).data]
+        )
+        self.assertEqual(
+            ['Replica'], [r['title'] for r in reader.get(RECIPES_URL).data]
+        )
+
+    def test_login_should_pin_issued_token_only(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        get_user_model()(
+            id=other.id, email=other.email, password=other.password
+        ).save(using='sqlite3')
+        create_recipe(self.user.id, title='Primary')
+        create_recipe(self.user.id, using='sqlite3', title='Replica')
+        create_recipe(other.id, using='sqlite3', title='Replica')
+        reader = self.token_client(other)
+
+        res = APIClient().post(reverse('token-list'), {
+            'email': 'test@example.com', 'password': 'test123',
+        })
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        # The new token is not on the replica yet.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+
+        res = client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(['Primary'], [r['title'] for r in res.data])
+        self.assertEqual(
+            ['Replica'], [r['title'] for r in reader.get(RECIPES_URL).data]
+        )
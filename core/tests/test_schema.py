@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase, override_settings
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from io import StringIO
+from unittest.mock import patch
+import gzip
+import tempfile
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class CachedSchemaTests(SimpleTestCase):
+    def setUp(self) -> None:
+        schema.clear_cache()
+        self.client = APIClient()
+
+    def tearDown(self) -> None:
+        schema.clear_cache()
+
+    def test_schema_should_be_generated_once(self):
+        with patch('core.schema.generate', wraps=schema.generate) as generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(status.HTTP_200_OK, first.status_code)
+        self.assertEqual(1, generate.call_count)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(b'/api/recipes/', first.content)
+
+    def test_matching_etag_should_return_304(self):
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_gzip_should_be_served_when_accepted(self):
+        plain = self.client.get(SCHEMA_URL).content
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual('gzip', res['Content-Encoding'])
+        self.assertEqual(plain, gzip.decompress(res.content))
+
+    def test_gzip_with_zero_quality_should_not_be_served(self):
+        plain = self.client.get(SCHEMA_URL).content
+
+        res = self.client.get(
+            SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip;q=0, identity'
+        )
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(plain, res.content)
+
+    def test_json_format_should_be_cached_separately(self):
+        res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertTrue(res.content.startswith(b'{'))
+
+    def test_built_files_should_be_served_without_generating(self):
+        output_dir = tempfile.mkdtemp()
+        call_command('build_schema', output_dir=output_dir, stdout=StringIO())
+
+        with override_settings(SCHEMA_ROOT=output_dir), \
+                patch('core.schema.generate') as generate:
+            res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        generate.assert_not_called()
+        with open(f'{output_dir}/openapi.yaml.gz', 'rb') as built:
+            self.assertEqual(built.read(), res.content)
@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+from unittest import mock
+
+from core.storage import LocalMediaStorage
+from core.tests.utils import use_temp_media_root
+
+
+class LocalStorageViewTests(SimpleTestCase):
+
+    def setUp(self) -> None:
+        use_temp_media_root(self)
+        self.storage = LocalMediaStorage()
+
+    def upload_url(self, name='uploads/a.png', max_size=10):
+        return self.storage.presigned_upload(
+            name, 'image/png', max_size, 60
+        )['url']
+
+    def test_signed_put_then_get_should_round_trip(self):
+        res = self.client.put(
+            self.upload_url(), b'data', content_type='image/png'
+        )
+        self.assertEqual(201, res.status_code)
+
+        res = self.client.get(
+            self.storage.presigned_download('uploads/a.png', 60)
+        )
+
+        self.assertEqual(200, res.status_code)
+        self.assertEqual('image/png', res['Content-Type'])
+        self.assertEqual(b'data', b''.join(res.streaming_content))
+
+    def test_tampered_signature_should_return_403(self):
+        url = self.upload_url().replace('max_size=10', 'max_size=99')
+
+        res = self.client.put(url, b'data', content_type='image/png')
+
+        self.assertEqual(403, res.status_code)
+
+    def test_url_for_other_name_should_return_403(self):
+        url = self.storage.presigned_download('uploads/a.png', 60)
+
+        res = self.client.get(url.replace('a.png', 'b.png'))
+
+        self.assertEqual(403, res.status_code)
+
+    def test_expired_url_should_return_403(self):
+        url = self.storage.presigned_download('uploads/a.png', 60)
+
+        with mock.patch('core.storage.time.time', return_value=1e12):
+            res = self.client.get(url)
+
+        self.assertEqual(403, res.status_code)
+
+    def test_upload_over_max_size_should_return_413(self):
+        res = self.client.put(
+            self.upload_url(max_size=3), b'data', content_type='image/png'
+        )
+
+        self.assertEqual(413, res.status_code)
+
+    def test_upload_with_other_content_type_should_return_400(self):
+        res = self.client.put(
+            self.upload_url(), b'data', content_type='text/html'
+        )
+
+        self.assertEqual(400, res.status_code)
+
+    def test_upload_over_existing_object_should_return_409(self):
+        url = self.upload_url()
+        self.client.put(url, b'data', content_type='image/png')
+
+        res = self.client.put(url, b'other', content_type='image/png')
+
+        self.assertEqual(409, res.status_code)
@@ -0,0 +1,146 @@
+from asgiref.sync import async_to_sync
+from django.test import (
+    AsyncClient, SimpleTestCase, TestCase, override_settings
+)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from unittest import mock
+
+from core.throttling import CacheBucketStore, LocalBucketStore, get_store
+
+TOKEN_URL = reverse('token-list')
+RECIPES_URL = reverse('recipe-list')
+ASYNC_RECIPES_URL = reverse('async-recipe-list')
+
+
+def rates(**overrides):
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = dict(
+        rest_framework['DEFAULT_THROTTLE_RATES'], **overrides
+    )
+    return override_settings(REST_FRAMEWORK=rest_framework)
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+
+    @mock.patch('core.throttling.time.monotonic')
+    def test_bucket_should_allow_burst_then_refill(self, monotonic):
+        store = LocalBucketStore()
+        monotonic.return_value = 100.0
+
+        self.assertEqual(0, store.consume('k', 2, 1.0))
+        self.assertEqual(0, store.consume('k', 2, 1.0))
+        self.assertAlmostEqual(1.0, store.consume('k', 2, 1.0))
+
+        monotonic.return_value = 100.5
+        self.assertAlmostEqual(0.5, store.consume('k', 2, 1.0))
+        monotonic.return_value = 101.0
+        self.assertEqual(0, store.consume('k', 2, 1.0))
+
+    def test_buckets_should_be_independent_per_key(self):
+        store = LocalBucketStore()
+
+        self.assertEqual(0, store.consume('a', 1, 1.0))
+        self.assertNotEqual(0, store.consume('a', 1, 1.0))
+        self.assertEqual(0, store.consume('b', 1, 1.0))
+
+    def test_full_stripe_should_evict_least_recently_used_bucket(self):
+        store = LocalBucketStore()
+        store.stripes = 1
+        store.max_keys_per_stripe = 2
+        store.__init__()
+        store.consume('a', 1, 1.0)
+        store.consume('b', 1, 1.0)
+        store.consume('a', 1, 1.0)
+
+        store.consume('c', 1, 1.0)
+
+        self.assertEqual(['a', 'c'], list(store._buckets[0]))
+
+
+class CacheBucketStoreTests(SimpleTestCase):
+
+    def test_bucket_should_allow_burst_then_throttle(self):
+        store = CacheBucketStore('default')
+        store.clear()
+
+        self.assertEqual(0, store.consume('throttle_k', 2, 1.0))
+        self.assertEqual(0, store.consume('throttle_k', 2, 1.0))
+        self.assertGreater(store.consume('throttle_k', 2, 1.0), 0)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_STORE='local')
+class ThrottleApiTests(TestCase):
+
+    def setUp(self) -> None:
+        get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='test123'
+        )
+        self.client = APIClient()
+
+    def tearDown(self) -> None:
+        get_store().clear()
+
+    def test_token_scope_should_return_429_with_retry_after(self):
+        payload = {'email': 'test@example.com', 'password': 'test123'}
+        with rates(token='2/min'):
+            for _ in range(2):
+                res = self.client.post(TOKEN_URL, payload)
+                self.assertEqual(status.HTTP_200_OK, res.status_code)
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(status.HTTP_429_TOO_MANY_REQUESTS, res.status_code)
+        self.assertEqual('30', res['Retry-After'])
+
+    def test_forwarded_for_header_should_not_reset_ip_buckets(self):
+        payload = {'email': 'test@example.com', 'password': 'test123'}
+        with rates(token='1/min'):
+            self.client.post(
+                TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='10.0.0.1'
+            )
+            res = self.client.post(
+                TOKEN_URL, payload, HTTP_X_FORWARDED_FOR='10.0.0.2'
+            )
+
+        self.assertEqual(status.HTTP_429_TOO_MANY_REQUESTS, res.status_code)
+
+    def test_user_rate_should_be_per_user(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        with rates(user='1/min'):
+            self.client.force_authenticate(user=self.user)
+            self.assertEqual(200, self.client.get(RECIPES_URL).status_code)
+            self.assertEqual(429, self.client.get(RECIPES_URL).status_code)
+            self.client.force_authenticate(user=other)
+            self.assertEqual(200, self.client.get(RECIPES_URL).status_code)
+
+    def test_async_views_should_be_throttled(self):
+        token = Token.objects.create(user=self.user)
+        client = AsyncClient()
+
+        def get():
+            return async_to_sync(client.get)(
+                ASYNC_RECIPES_URL, authorization=f'Token {token.key}'
+            )
+
+        with rates(recipes='1/min'):
+            self.assertEqual(status.HTTP_200_OK, get().status_code)
+            res = get()
+
+        self.assertEqual(status.HTTP_429_TOO_MANY_REQUESTS, res.status_code)
+        self.assertEqual('60', res['Retry-After'])
+
+    def test_disabled_rate_should_not_throttle(self):
+        self.client.force_authenticate(user=self.user)
+        with rates(user=None, recipes=None, ip='1/min'):
+            self.client.get(RECIPES_URL)
+            with override_settings(THROTTLE_ENABLED=False):
+                res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
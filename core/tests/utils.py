@@ -0,0 +1,20 @@
+"""
+Helpers shared by the test modules.
+"""
+import tempfile
+
+from django.test import override_settings
+
+
+def use_temp_media_root(test_case, **overrides):
+    """
+    Point MEDIA_ROOT, and any other `overrides`, at an empty temporary
+    directory for the rest of `test_case`; return the directory. Test
+    cleanups restore the settings and remove the directory.
+    """
+    media_root = tempfile.TemporaryDirectory()
+    test_case.addCleanup(media_root.cleanup)
+    media_settings = override_settings(MEDIA_ROOT=media_root.name, **overrides)
+    media_settings.enable()
+    test_case.addCleanup(media_settings.disable)
+    return media_root.name
@@ -0,0 +1,213 @@
+"""
+Token bucket throttles for DRF.
+
+Every client gets a bucket holding up to `num_requests` tokens of its rate
+("100/min"), refilled continuously at num_requests / duration per second;
+a request takes one token, and a throttled one is told how long until the
+next token in Retry-After. Buckets are kept per user, per IP address, or
+per user and view `throttle_scope`.
+
+DRF's own throttles keep a list of request timestamps per client in the
+cache and rewrite it on every request. A bucket is two numbers, and by
+default it lives in process memory behind striped locks, so a check is a
+dict lookup rather than a cache round trip. Limits are then per process:
+divide the intended rate by the number of worker processes, or set
+THROTTLE_STORE = 'cache' to share buckets through the THROTTLE_CACHE cache.
+Cache updates are read-modify-write, so concurrent requests may
+occasionally spend the same token.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def _take(tokens, refill_rate):
+    """Return the wait in seconds (0 if granted) and the tokens left."""
+    if tokens >= 1:
+        return 0, tokens - 1
+    return (1 - tokens) / refill_rate, tokens
+
+
+class LocalBucketStore:
+    """
+    Buckets in process memory, guarded by a fixed set of striped locks.
+
+    Each stripe keeps at most `max_keys_per_stripe` buckets in least
+    recently used order and evicts the oldest one to make room, so memory
+    stays bounded and an insert never scans the stripe. An evicted client
+    starts over with a full bucket; with this many buckets per stripe that
+    is one that has been idle the longest.
+    """
+    stripes = 64
+    max_keys_per_stripe = 4096
+
+    def __init__(self):
+        self._locks = [threading.Lock() for _ in range(self.stripes)]
+        self._buckets = [OrderedDict() for _ in range(self.stripes)]
+
+    def consume(self, key, capacity, refill_rate):
+        index = hash(key) % self.stripes
+        with self._locks[index]:
+            now = time.monotonic()
+            buckets = self._buckets[index]
+            state = buckets.get(key)
+            if state is None:
+                if len(buckets) >= self.max_keys_per_stripe:
+                    buckets.popitem(last=False)
+                tokens = capacity
+            else:
+                buckets.move_to_end(key)
+                tokens = min(
+                    capacity, state[0] + (now - state[1]) * refill_rate
+                )
+            wait, tokens = _take(tokens, refill_rate)
+            buckets[key] = (tokens, now)
+            return wait
+
+    def clear(self):
+        for lock, buckets in zip(self._locks, self._buckets):
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache shared by all processes."""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.time()
+        state = self.cache.get(key)
+        if state is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, state[0] + (now - state[1]) * refill_rate)
+        wait, tokens = _take(tokens, refill_rate)
+        self.cache.set(
+            key, (tokens, now),
+            math.ceil((capacity - tokens) / refill_rate) + 1
+        )
+        return wait
+
+    def clear(self):
+        self.cache.clear()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """The bucket store selected by THROTTLE_STORE ('local' or 'cache')."""
+    name = settings.THROTTLE_STORE
+    if name == 'cache':
+        name = f'cache:{settings.THROTTLE_CACHE}'
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(name)
+            if store is None:
+                if name == 'local':
+                    store = LocalBucketStore()
+                elif name.startswith('cache:'):
+                    store = CacheBucketStore(settings.THROTTLE_CACHE)
+                else:
+                    raise ImproperlyConfigured(
+                        f'Unknown THROTTLE_STORE "{name}", expected '
+                        f'local or cache.'
+                    )
+                _stores[name] = store
+    return store
+
+
+@lru_cache(maxsize=None)
+def _parse_rate(rate):
+    """'100/min' -> (100, 60), as SimpleRateThrottle.parse_rate()."""
+    num, period = rate.split('/')
+    return int(num), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Base class: subclasses set `scope` and implement get_cache_key().
+
+    Rates are read from DEFAULT_THROTTLE_RATES on every request rather than
+    once at import, so they follow override_settings, and a rate of None
+    disables the throttle.
+    """
+
+    def __init__(self):
+        self._wait = 0
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"No default throttle rate set for '{self.scope}' scope"
+            )
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        num_requests, duration = _parse_rate(rate)
+        self._wait = get_store().consume(
+            key, num_requests, num_requests / duration
+        )
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Every request, keyed by client IP address."""
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Keyed by user; anonymous requests are keyed by IP address."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ScopedTokenBucketThrottle(UserTokenBucketThrottle):
+    """
+    Keyed by user and the view's `throttle_scope`, so each endpoint class
+    has its own rate. Views without a scope are not throttled.
+    """
+    scope_attr = 'throttle_scope'
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        return super().allow_request(request, view)
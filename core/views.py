@@ -1,3 +1,130 @@
-from django.shortcuts import render
+import hmac
+import ipaddress
+import json
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import authentication, permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.media import serve
+from core.metrics import render_prometheus
+from core.profiling import profile_paths
+from core.storage import LocalMediaStorage
+
 
 # Create your views here.
+def metrics(request):
+    """
+    Request metrics of this process in the Prometheus text format, for the
+    scrapers settings.METRICS_ALLOWED_IPS and METRICS_TOKEN let in.
+
+    Every worker process keeps its own registry and a scrape reads only the
+    process that happens to serve it, so give each process its own scrape
+    target (e.g. one process per container) and sum across targets in
+    queries; behind a shared port the series would jump between workers.
+    """
+    if not _may_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(
+        render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def _may_scrape(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if settings.METRICS_TOKEN and scheme.lower() == 'bearer':
+        return hmac.compare_digest(
+            token.encode(), settings.METRICS_TOKEN.encode()
+        )
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+class ProfileView(APIView):
+    """
+    A request profile captured by core.profiling.ProfilingMiddleware: the
+    summary with SQL and top functions, or the raw cProfile dump with
+    ?download=1 (open it with pstats or snakeviz).
+    """
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        authentication.SessionAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+    # Internal tooling, not part of the public API schema.
+    schema = None
+
+    def get(self, request, profile_id):
+        paths = profile_paths(profile_id)
+        if paths is None or not paths[1].exists():
+            raise NotFound()
+        prof_path, summary_path = paths
+        if request.query_params.get('download'):
+            return FileResponse(
+                open(prof_path, 'rb'),
+                as_attachment=True,
+                filename=prof_path.name,
+            )
+        return Response(json.loads(summary_path.read_text()))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LocalStorageView(View):
+    """
+    Object endpoint of LocalMediaStorage: GET downloads and PUT uploads the
+    object `name` through a URL presigned by the storage, the way clients
+    talk to S3 directly.
+    """
+    http_method_names = ['get', 'head', 'put']
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        if not isinstance(default_storage, LocalMediaStorage):
+            raise Http404()
+        self.storage = default_storage
+
+    def get(self, request, name):
+        if not self.storage.verify('GET', name, request.GET):
+            raise PermissionDenied()
+        return serve(request, self.storage, name)
+
+    def put(self, request, name):
+        content_type = request.GET.get('content_type', '')
+        max_size = request.GET.get('max_size', '')
+        if not self.storage.verify(
+            'PUT', name, request.GET, content_type, max_size
+        ):
+            raise PermissionDenied()
+        if request.content_type != content_type:
+            return HttpResponse('Content-Type does not match.', status=400)
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if not 0 < length <= int(max_size):
+            return HttpResponse('Invalid size.', status=413)
+        if self.storage.exists(name):
+            return HttpResponse('Object exists.', status=409)
+
+        saved = self.storage.save(name, File(request, name))
+        if saved != name:
+            # Lost a race with another upload to the same name.
+            self.storage.delete(saved)
+            return HttpResponse('Object exists.', status=409)
+        return HttpResponse(status=201)
@@ -0,0 +1,117 @@
+"""
+Async read-only views for the recipe API.
+
+These serve the same data as the list/retrieve actions of the recipe
+viewsets but run natively under ASGI (see app/asgi.py): token
+authentication, permission checks and queries use Django's async ORM
+instead of occupying a worker thread for the whole request. The viewset's
+throttles (DEFAULT_THROTTLE_CLASSES and its throttle_scope) apply as on
+the sync endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipe.views import RecipeViewSet, TagViewSet, IngredientViewSet
+
+
+class AsyncReadOnlyView(View):
+    """
+    Serve list and retrieve for `viewset_class` asynchronously.
+
+    Filtering and serializer selection are delegated to the viewset so the
+    async endpoints stay in step with the sync ones.
+    """
+    http_method_names = ['get', 'head', 'options']
+    viewset_class = None
+    renderer = JSONRenderer()
+
+    async def authenticate(self, request):
+        auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(auth) != 2 or auth[0].lower() != 'token':
+            return None
+        try:
+            token = await Token.objects.select_related('user').aget(
+                key=auth[1]
+            )
+        except Token.DoesNotExist:
+            return None
+        if not token.user.is_active:
+            return None
+        return token.user
+
+    def get_viewset(self, request, user, action):
+        drf_request = Request(request)
+        drf_request.user = user
+        viewset = self.viewset_class(
+            request=drf_request,
+            action=action,
+            format_kwarg=None,
+            kwargs=self.kwargs,
+            args=self.args,
+        )
+        return viewset
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data),
+            content_type=self.renderer.media_type,
+            status=status_code,
+        )
+
+    async def check_throttles(self, viewset):
+        # A cache-backed THROTTLE_STORE blocks, so keep it off the loop.
+        await sync_to_async(viewset.check_throttles, thread_sensitive=False)(
+            viewset.request
+        )
+
+    def error(self, exc):
+        response = self.render({'detail': exc.detail}, exc.status_code)
+        if isinstance(exc, exceptions.NotAuthenticated):
+            response['WWW-Authenticate'] = 'Token'
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    async def get(self, request, pk=None):
+        user = await self.authenticate(request)
+        if user is None:
+            return self.error(exceptions.NotAuthenticated())
+
+        action = 'list' if pk is None else 'retrieve'
+        viewset = self.get_viewset(request, user, action)
+        try:
+            await self.check_throttles(viewset)
+        except exceptions.Throttled as exc:
+            return self.error(exc)
+
+        queryset = viewset.get_queryset()
+        serializer_class = viewset.get_serializer_class()
+        context = viewset.get_serializer_context()
+
+        if pk is None:
+            instances = [obj async for obj in queryset]
+            serializer = serializer_class(instances, many=True, context=context)
+            return self.render(serializer.data)
+
+        try:
+            instance = await queryset.aget(pk=pk)
+        except (queryset.model.DoesNotExist, ValueError):
+            return self.error(exceptions.NotFound())
+        return self.render(serializer_class(instance, context=context).data)
+
+
+class AsyncRecipeView(AsyncReadOnlyView):
+    viewset_class = RecipeViewSet
+
+
+class AsyncTagView(AsyncReadOnlyView):
+    viewset_class = TagViewSet
+
+
+class AsyncIngredientView(AsyncReadOnlyView):
+    viewset_class = IngredientViewSet
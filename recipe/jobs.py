@@ -0,0 +1,25 @@
+from PIL import UnidentifiedImageError
+
+from core import images
+from core.jobs import task
+from core.models import Recipe
+
+
+@task(concurrency=2)
+def render_image_variants(recipe_id, name):
+    """
+    Render all variants of a newly attached recipe image ahead of the
+    first requests for them.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or recipe.image.name != name:
+        return  # Deleted, or the image was replaced since.
+    try:
+        for width, height in images.allowed_sizes():
+            for fmt in images.FORMATS:
+                images.get_variant(
+                    recipe.image.storage, name, width, height, fmt
+                )
+    except (FileNotFoundError, UnidentifiedImageError):
+        # Nothing to render; the variant view answers 404 for these too.
+        return
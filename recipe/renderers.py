@@ -0,0 +1,10 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class NormalizedJSONRenderer(JSONRenderer):
+    """
+    JSON with related objects sideloaded once, selected with
+    `?format=normalized` or by its media type in the Accept header.
+    """
+    media_type = 'application/vnd.recipe-app.normalized+json'
+    format = 'normalized'
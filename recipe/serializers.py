@@ -1,5 +1,11 @@
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
-from core.models import Recipe, Tag, Ingredient
+from rest_framework.utils.serializer_helpers import ReturnDict
+from core import images
+from core.cache import set_recipe_detail
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+from core.storage import IMAGE_CONTENT_TYPES
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -33,9 +39,79 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only = ['id']
 
 
+class NormalizedRecipeListSerializer(serializers.ListSerializer):
+    """
+    Represent a list of recipes as
+    `{"recipes": [...], "tags": {id: tag}, "ingredients": {id: ingredient}}`
+    where recipes reference their tags and ingredients by ID, so every
+    distinct tag and ingredient is serialized only once.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        tags = {}
+        ingredients = {}
+        for recipe in recipes:
+            for tag in recipe.tags.all():
+                tags[tag.pk] = tag
+            for ingredient in recipe.ingredients.all():
+                ingredients[ingredient.pk] = ingredient
+
+        return {
+            'recipes': [self.child.to_representation(r) for r in recipes],
+            'tags': {
+                str(tag['id']): tag
+                for tag in TagSerializer(tags.values(), many=True).data
+            },
+            'ingredients': {
+                str(ingredient['id']): ingredient
+                for ingredient in IngredientSerializer(
+                    ingredients.values(), many=True
+                ).data
+            },
+        }
+
+    @property
+    def data(self):
+        return ReturnDict(
+            serializers.BaseSerializer.data.fget(self), serializer=self
+        )
+
+
+class NormalizedRecipeSerializer(RecipeSerializer):
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    ingredients = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = NormalizedRecipeListSerializer
+
+
 class RecipeDetailSerializer(RecipeSerializer):
+    image_variants = serializers.SerializerMethodField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_variants'
+        ]
+
+    def get_image_variants(self, recipe) -> dict:
+        """URLs of the resized variants, by size and then format."""
+        if not recipe.image:
+            return {}
+        request = self.context.get('request')
+        variants = {}
+        for width, height in images.allowed_sizes():
+            size = f'{width}x{height}'
+            variants[size] = {}
+            for fmt in images.FORMATS:
+                url = reverse(
+                    'recipe-image-variant',
+                    args=[recipe.pk, width, height, fmt]
+                )
+                variants[size][fmt] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return variants
 
     def _get_or_create_tags(self, tags, recipe):
         auth_user = self.context['request'].user
@@ -58,27 +134,63 @@ class RecipeDetailSerializer(RecipeSerializer):
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        # The change log is written in one INSERT, in the same transaction.
+        with transaction.atomic(), ChangeLog.objects.batch():
+            recipe = Recipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, recipe)
+            self._get_or_create_ingredients(ingredients, recipe)
 
+        self._write_through(recipe)
         return recipe
 
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+        with transaction.atomic(), ChangeLog.objects.batch():
+            if tags is not None:
+                instance.tags.clear()
+                self._get_or_create_tags(tags, instance)
+            if ingredients is not None:
+                instance.ingredients.clear()
+                self._get_or_create_ingredients(ingredients, instance)
+
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+
+            instance.save()
+        self._write_through(instance)
+        return instance
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+    def _write_through(self, recipe):
+        """Cache the representation the response is about to carry."""
+        request = self.context.get('request')
+        if request is None:
+            return
+        # Serializer.data returns _data when set, so the response reuses
+        # the representation instead of building it again.
+        self._data = self.to_representation(recipe)
+        set_recipe_detail(
+            recipe.pk, recipe.user_id,
+            request.build_absolute_uri('/'), self._data,
+        )
 
-        instance.save()
-        return instance
+
+class SyncRecipeSerializer(RecipeDetailSerializer):
+    """Recipe as sent by the sync endpoint: tags and ingredients by ID."""
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    ingredients = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+class FacetSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeFacetsSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    tags = FacetSerializer(many=True)
+    ingredients = FacetSerializer(many=True)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -87,3 +199,11 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class RecipeImageUploadSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=list(IMAGE_CONTENT_TYPES))
+
+
+class RecipeImageConfirmSerializer(serializers.Serializer):
+    token = serializers.CharField()
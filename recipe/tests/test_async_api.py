@@ -0,0 +1,133 @@
+from asgiref.sync import async_to_sync
+from django.test import TestCase, AsyncClient
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from decimal import Decimal
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    TagSerializer
+)
+
+from core.models import Recipe, Tag
+
+ASYNC_RECIPES_URL = reverse('async-recipe-list')
+ASYNC_TAGS_URL = reverse('async-tag-list')
+
+
+def auth_headers(key):
+    # AsyncClient turns extra kwargs into raw ASGI header names.
+    return {'authorization': f'Token {key}'}
+
+
+def detail_url(recipe_id):
+    return reverse('async-recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Test title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'description': 'Test desc'
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicAsyncRecipeApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = AsyncClient()
+
+    async def test_without_auth_should_return_401(self):
+        res = await self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+    async def test_with_invalid_token_should_return_401(self):
+        res = await self.client.get(
+            ASYNC_RECIPES_URL,
+            **auth_headers('invalid')
+        )
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+
+class PrivateAsyncRecipeApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='test123',
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email='test123@example.com',
+            password='test123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.auth = auth_headers(token.key)
+        self.client = AsyncClient()
+
+    def test_list_recipes_should_return_200(self):
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        create_recipe(user=self.other_user)
+
+        res = self.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        self.assertEqual(
+            RecipeSerializer(recipes, many=True).data,
+            res.json()
+        )
+
+    def test_list_recipes_filter_by_tags_should_return_200(self):
+        r1 = create_recipe(user=self.user, title='R1')
+        create_recipe(user=self.user, title='R2')
+        tag = Tag.objects.create(user=self.user, name='T1')
+        r1.tags.add(tag)
+
+        res = self.get(ASYNC_RECIPES_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        recipes = Recipe.objects.filter(id=r1.id)
+        self.assertEqual(
+            RecipeSerializer(recipes, many=True).data,
+            res.json()
+        )
+
+    def test_get_recipe_details_should_return_200(self):
+        recipe = create_recipe(user=self.user)
+
+        res = self.get(detail_url(recipe.id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(RecipeDetailSerializer(recipe).data, res.json())
+
+    def test_get_recipe_details_from_other_user_should_return_404(self):
+        recipe = create_recipe(user=self.other_user)
+
+        res = self.get(detail_url(recipe.id))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    def test_list_tags_should_return_200(self):
+        Tag.objects.create(user=self.user, name='A')
+        Tag.objects.create(user=self.user, name='B')
+        Tag.objects.create(user=self.other_user, name='C')
+
+        res = self.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        tags = Tag.objects.filter(user=self.user).order_by('-name')
+        self.assertEqual(TagSerializer(tags, many=True).data, res.json())
+
+    def get(self, url, data=None):
+        async def request():
+            return await self.client.get(url, data, **self.auth)
+
+        return async_to_sync(request)()
@@ -1,8 +1,4 @@
-from django import setup
-
-setup()
-
-from django.test import TransactionTestCase
+from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -38,7 +34,7 @@ def create_ingredient(user, **params):
     return Ingredient.objects.create(user=user, **defaults)
 
 
-class PublicIngredientApiTests(TransactionTestCase):
+class PublicIngredientApiTests(TestCase):
 
     def setUp(self) -> None:
         self.client = APIClient()
@@ -49,7 +45,7 @@ class PublicIngredientApiTests(TransactionTestCase):
         self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
 
 
-class PrivateIngredientApiTests(TransactionTestCase):
+class PrivateIngredientApiTests(TestCase):
 
     def setUp(self) -> None:
         payload = {
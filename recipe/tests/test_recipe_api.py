@@ -1,21 +1,24 @@
-from django import setup
-
-setup()
-
-from django.test import TransactionTestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
+from core.cache import add_recipe_detail
 from core.models import Recipe, Tag, Ingredient
+from core.querywatch import QueryBudgetTestMixin
+from core.tests.utils import use_temp_media_root
 import tempfile
+import io
 import os
 from PIL import Image
 
 RECIPES_URL = reverse('recipe-list')
+FACETS_URL = reverse('recipe-facets')
+BATCH_URL = reverse('recipe-batch')
 
 
 def detail_url(recipe_id):
@@ -42,6 +45,29 @@ def image_upload_url(recipe_id):
     return reverse('recipe-upload-image', args=[recipe_id])
 
 
+def image_upload_url_url(recipe_id):
+    return reverse('recipe-image-upload-url', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    return reverse('recipe-image', args=[recipe_id])
+
+
+def image_variant_url(recipe_id, size='160x160', fmt='webp'):
+    width, height = size.split('x')
+    return reverse(
+        'recipe-image-variant', args=[recipe_id, int(width), int(height), fmt]
+    )
+
+
+def duplicate_url(recipe_id):
+    return reverse('recipe-duplicate', args=[recipe_id])
+
+
+def confirm_image_url(recipe_id):
+    return reverse('recipe-confirm-image', args=[recipe_id])
+
+
 def create_recipe(user, **params):
     defaults = {
         'title': 'Test title',
@@ -53,7 +79,7 @@ def create_recipe(user, **params):
     return Recipe.objects.create(user=user, **defaults)
 
 
-class PublicRecipeApiTests(TransactionTestCase):
+class PublicRecipeApiTests(TestCase):
 
     def setUp(self) -> None:
         self.client = APIClient()
@@ -64,7 +90,7 @@ class PublicRecipeApiTests(TransactionTestCase):
         self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
 
 
-class PrivateRecipeApiTests(TransactionTestCase):
+class PrivateRecipeApiTests(QueryBudgetTestMixin, TestCase):
 
     def setUp(self) -> None:
         payload = {
@@ -142,6 +168,255 @@ class PrivateRecipeApiTests(TransactionTestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_retrieve_recipes_should_stay_within_query_budget(self):
+        for i in range(6):
+            recipe = create_recipe(user=self.user, title=f'R{i}')
+            recipe.tags.add(create_tag(user=self.user, name=f'T{i}'))
+            recipe.ingredients.add(
+                create_ingredient(user=self.user, name=f'I{i}')
+            )
+
+        # Recipes, their tags and their ingredients.
+        with self.assertQueryBudget(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(6, len(res.data))
+
+    def test_retrieve_recipes_normalized_should_sideload_tags_once(self):
+        tag = create_tag(user=self.user, name='Dinner')
+        ingredient = create_ingredient(user=self.user, name='Salt')
+        r1 = create_recipe(user=self.user, title='R1')
+        r2 = create_recipe(user=self.user, title='R2')
+        for recipe in (r1, r2):
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        with self.assertQueryBudget(3):
+            res = self.client.get(RECIPES_URL, {'format': 'normalized'})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        body = res.json()
+        self.assertEqual([r2.id, r1.id], [r['id'] for r in body['recipes']])
+        self.assertEqual([tag.id], body['recipes'][0]['tags'])
+        self.assertEqual([ingredient.id], body['recipes'][0]['ingredients'])
+        self.assertEqual(
+            {str(tag.id): {'id': tag.id, 'name': 'Dinner'}}, body['tags']
+        )
+        self.assertEqual(
+            {str(ingredient.id): {'id': ingredient.id, 'name': 'Salt'}},
+            body['ingredients']
+        )
+
+    def test_retrieve_recipes_normalized_by_accept_should_return_200(self):
+        create_recipe(user=self.user)
+
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_ACCEPT='application/vnd.recipe-app.normalized+json'
+        )
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            {'recipes', 'tags', 'ingredients'}, set(res.json())
+        )
+
+    def test_facets_should_count_filtered_recipes(self):
+        dinner = create_tag(user=self.user, name='Dinner')
+        quick = create_tag(user=self.user, name='Quick')
+        salt = create_ingredient(user=self.user, name='Salt')
+        r1 = create_recipe(user=self.user)
+        r1.tags.add(dinner, quick)
+        r1.ingredients.add(salt)
+        r2 = create_recipe(user=self.user)
+        r2.tags.add(dinner)
+        create_recipe(user=self.user)
+
+        with self.assertQueryBudget(3):
+            res = self.client.get(FACETS_URL, {'tags': f'{dinner.id}'})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(2, res.data['count'])
+        self.assertEqual([
+            {'id': dinner.id, 'name': 'Dinner', 'count': 2},
+            {'id': quick.id, 'name': 'Quick', 'count': 1},
+        ], res.data['tags'])
+        self.assertEqual(
+            [{'id': salt.id, 'name': 'Salt', 'count': 1}],
+            res.data['ingredients']
+        )
+
+    def test_facets_should_be_cached_until_a_write(self):
+        create_recipe(user=self.user)
+        self.client.get(FACETS_URL)
+
+        with self.assertQueryBudget(0):
+            res = self.client.get(FACETS_URL)
+        self.assertEqual(1, res.data['count'])
+
+        create_recipe(user=self.user)
+        self.assertEqual(2, self.client.get(FACETS_URL).data['count'])
+
+    def test_batch_should_return_details_in_requested_order(self):
+        first = create_recipe(user=self.user, title='First')
+        second = create_recipe(user=self.user, title='Second')
+        second.tags.add(create_tag(user=self.user))
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        foreign = create_recipe(user=other)
+
+        with self.assertQueryBudget(3):
+            res = self.client.get(BATCH_URL, {
+                'ids': f'{second.id},{foreign.id},{first.id},{second.id}'
+            })
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            ['Second', 'First'], [recipe['title'] for recipe in res.data]
+        )
+        self.assertEqual(
+            RecipeDetailSerializer(
+                second, context={'request': res.wsgi_request}
+            ).data,
+            res.data[0]
+        )
+
+        with self.assertQueryBudget(0):
+            cached = self.client.get(BATCH_URL, {
+                'ids': f'{first.id},{second.id}'
+            })
+        self.assertEqual(
+            ['First', 'Second'], [recipe['title'] for recipe in cached.data]
+        )
+
+    @override_settings(RECIPE_BATCH_MAX_IDS=2)
+    def test_batch_should_reject_invalid_or_too_many_ids(self):
+        for ids in ('', '1,a', '1,2,3'):
+            res = self.client.get(BATCH_URL, {'ids': ids})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_duplicate_should_copy_recipe_tags_and_ingredients(self):
+        recipe = create_recipe(
+            user=self.user, title='Curry', image='uploads/recipe/a.jpg'
+        )
+        recipe.tags.add(create_tag(user=self.user, name='Dinner'))
+        recipe.ingredients.add(create_ingredient(user=self.user))
+        self.assertEqual(1, len(self.client.get(RECIPES_URL).data))
+
+        res = self.client.post(duplicate_url(recipe.id))
+
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+        copy = Recipe.objects.get(id=res.data['id'])
+        self.assertNotEqual(recipe.id, copy.id)
+        self.assertEqual(self.user, copy.user)
+        for field in ('title', 'time_minutes', 'price', 'description'):
+            self.assertEqual(getattr(recipe, field), getattr(copy, field))
+        self.assertEqual(recipe.image.name, copy.image.name)
+        self.assertEqual(
+            list(recipe.tags.values_list('id', flat=True)),
+            list(copy.tags.values_list('id', flat=True))
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list('id', flat=True)),
+            list(copy.ingredients.values_list('id', flat=True))
+        )
+        self.assertEqual(2, len(self.client.get(RECIPES_URL).data))
+        self.assertEqual(res.data, self.client.get(detail_url(copy.id)).data)
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_duplicate_should_be_logged_for_sync(self):
+        recipe = create_recipe(user=self.user)
+        token = self.client.get(reverse('sync')).data['token']
+
+        copy_id = self.client.post(duplicate_url(recipe.id)).data['id']
+
+        body = self.client.get(reverse('sync'), {'since': token}).json()
+        self.assertEqual(
+            [copy_id], [item['id'] for item in body['recipes']['changed']]
+        )
+
+    def test_duplicate_other_users_recipe_should_return_404(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        recipe = create_recipe(user=other)
+
+        res = self.client.post(duplicate_url(recipe.id))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+        self.assertEqual(1, Recipe.objects.count())
+
+    def test_get_recipe_details_should_stay_within_query_budget(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(create_tag(user=self.user))
+
+        with self.assertQueryBudget(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+    def test_get_recipe_details_should_be_cached_when_written(self):
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 10, 'price': Decimal('2.50'),
+            'tags': [{'name': 'Dinner'}],
+        }, format='json')
+
+        with self.assertQueryBudget(0):
+            detail = self.client.get(detail_url(res.data['id']))
+        self.assertEqual(res.data, detail.data)
+
+        res = self.client.patch(
+            detail_url(res.data['id']), {'title': 'Stew'}
+        )
+        with self.assertQueryBudget(0):
+            detail = self.client.get(detail_url(res.data['id']))
+        self.assertEqual('Stew', detail.data['title'])
+
+    def test_read_should_not_overwrite_newer_cached_details(self):
+        recipe = create_recipe(user=self.user, title='Old')
+        read = self.client.get(detail_url(recipe.id)).data
+        res = self.client.patch(detail_url(recipe.id), {'title': 'New'})
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+        # A read that loaded the recipe before the write finishes late.
+        add_recipe_detail(recipe.id, self.user.id, 'http://testserver/', read)
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual('New', res.data['title'])
+
+    def test_cached_recipe_details_should_follow_tag_changes(self):
+        recipe = create_recipe(user=self.user)
+        tag = create_tag(user=self.user, name='Vegan')
+        self.client.get(detail_url(recipe.id))
+
+        recipe.tags.add(tag)
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(['Vegan'], [t['name'] for t in res.data['tags']])
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(
+            ['Vegetarian'], [t['name'] for t in res.data['tags']]
+        )
+
+        tag.delete()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual([], res.data['tags'])
+
+    def test_cached_recipe_details_should_not_be_served_to_others(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        self.client.force_authenticate(user=other)
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
     def test_get_recipe_details_should_return_200(self):
         recipe = create_recipe(user=self.user)
 
@@ -438,7 +713,7 @@ class PrivateRecipeApiTests(TransactionTestCase):
         self.assertEqual(0, recipe.ingredients.count())
 
 
-class ImageUploadTests(TransactionTestCase):
+class ImageUploadTests(TestCase):
     def setUp(self) -> None:
         payload = {
             'email': 'test@example.com',
@@ -459,7 +734,7 @@ class ImageUploadTests(TransactionTestCase):
             img = Image.new('RGB', (10, 10))
             img.save(image_file, format='JPEG')
             image_file.seek(0)
-            payload = {'image', image_file}
+            payload = {'image': image_file}
             res = self.client.post(url, payload, format='multipart')
             self.assertEqual(status.HTTP_200_OK, res.status_code)
 
@@ -469,6 +744,141 @@ class ImageUploadTests(TransactionTestCase):
 
     def test_upload_image_with_invalid_image_should_return_400(self):
         url = image_upload_url(self.recipe.id)
-        payload = {'image', 'notanimage'}
+        payload = {'image': 'notanimage'}
         res = self.client.post(url, payload, format='multipart')
         self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+
+class DirectImageUploadTests(TestCase):
+    def setUp(self) -> None:
+        use_temp_media_root(self, MEDIA_STORAGE='local')
+
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def presign(self, recipe_id=None):
+        res = self.client.post(
+            image_upload_url_url(recipe_id or self.recipe.id),
+            {'content_type': 'image/png'}
+        )
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        return res.data
+
+    def test_direct_upload_should_attach_image(self):
+        presigned = self.presign()
+        upload = presigned['upload']
+        self.assertEqual('PUT', upload['method'])
+
+        res = self.client.put(
+            upload['url'], b'png bytes', content_type='image/png'
+        )
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+        res = self.client.post(
+            confirm_image_url(self.recipe.id), {'token': presigned['token']}
+        )
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        with self.recipe.image.open() as image:
+            self.assertEqual(b'png bytes', image.read())
+        self.assertEqual(
+            b'png bytes', b''.join(self.client.get(res.data['image']))
+        )
+
+    def test_confirm_without_upload_should_return_400(self):
+        token = self.presign()['token']
+
+        res = self.client.post(
+            confirm_image_url(self.recipe.id), {'token': token}
+        )
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_confirm_with_token_of_other_recipe_should_return_400(self):
+        other = create_recipe(user=self.user)
+        presigned = self.presign(other.id)
+        self.client.put(
+            presigned['upload']['url'], b'png', content_type='image/png'
+        )
+
+        res = self.client.post(
+            confirm_image_url(self.recipe.id), {'token': presigned['token']}
+        )
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_presign_with_unsupported_type_should_return_400(self):
+        res = self.client.post(
+            image_upload_url_url(self.recipe.id),
+            {'content_type': 'text/html'}
+        )
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_image_should_be_served_to_owner_only(self):
+        self.recipe.image.save('a.png', ContentFile(b'png'))
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+
+        res = self.client.get(
+            image_url(self.recipe.id), HTTP_ACCEPT='image/*'
+        )
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(b'png', b''.join(res.streaming_content))
+
+        self.client.force_authenticate(user=other)
+        res = self.client.get(image_url(self.recipe.id))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    @override_settings(MEDIA_SENDFILE='nginx')
+    def test_image_should_be_handed_to_nginx(self):
+        self.recipe.image.save('a.png', ContentFile(b'png'))
+
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            f'/protected-media/{self.recipe.image.name}',
+            res['X-Accel-Redirect']
+        )
+
+    def test_missing_image_should_return_404(self):
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    def test_image_variant_should_be_resized(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200)).save(buffer, format='PNG')
+        self.recipe.image.save('a.png', ContentFile(buffer.getvalue()))
+
+        res = self.client.get(image_variant_url(self.recipe.id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual('image/webp', res['Content-Type'])
+        variant = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual((160, 80), variant.size)
+
+    def test_image_variant_of_unlisted_size_should_return_404(self):
+        self.recipe.image.save('a.png', ContentFile(b'png'))
+
+        res = self.client.get(image_variant_url(self.recipe.id, '161x160'))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    def test_recipe_detail_should_list_image_variants(self):
+        self.recipe.image.save('a.png', ContentFile(b'png'))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(
+            'http://testserver' + image_variant_url(self.recipe.id),
+            res.data['image_variants']['160x160']['webp']
+        )
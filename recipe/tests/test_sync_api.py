@@ -0,0 +1,189 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from decimal import Decimal
+
+from core.models import ChangeLog, Recipe, Tag, Ingredient
+from core.querywatch import QueryBudgetTestMixin
+
+SYNC_URL = reverse('sync')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Test title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncApiTests(TestCase):
+
+    def test_without_auth_should_return_401(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class PrivateSyncApiTests(QueryBudgetTestMixin, TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='test123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def sync(self, token=None):
+        params = {} if token is None else {'since': token}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        return res.json()
+
+    def test_sync_without_token_should_return_snapshot(self):
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        create_recipe(user=other)
+
+        body = self.sync()
+
+        self.assertEqual([recipe.id], [r['id'] for r in body['recipes']['changed']])
+        self.assertEqual([tag.id], body['recipes']['changed'][0]['tags'])
+        self.assertEqual([{'id': tag.id, 'name': 'Dinner'}], body['tags']['changed'])
+        self.assertFalse(body['has_more'])
+
+    def test_sync_with_token_should_return_only_changes(self):
+        kept = create_recipe(user=self.user, title='Kept')
+        changed = create_recipe(user=self.user, title='Changed')
+        removed = create_recipe(user=self.user, title='Removed')
+        token = self.sync()['token']
+
+        changed.title = 'Renamed'
+        changed.save()
+        removed_id = removed.id
+        removed.delete()
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        body = self.sync(token)
+
+        self.assertEqual(
+            [changed.id], [r['id'] for r in body['recipes']['changed']]
+        )
+        self.assertEqual('Renamed', body['recipes']['changed'][0]['title'])
+        self.assertEqual([removed_id], body['recipes']['deleted'])
+        self.assertEqual([ingredient.id], [i['id'] for i in body['ingredients']['changed']])
+        self.assertNotIn(kept.id, [r['id'] for r in body['recipes']['changed']])
+        self.assertEqual({'changed': [], 'deleted': []}, self.sync(body['token'])['recipes'])
+
+    def test_sync_should_report_m2m_changes_from_either_side(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        token = self.sync()['token']
+
+        tag.recipe_set.add(recipe)
+        body = self.sync(token)
+        self.assertEqual([tag.id], body['recipes']['changed'][0]['tags'])
+
+        tag.recipe_set.clear()
+        body = self.sync(body['token'])
+        self.assertEqual([], body['recipes']['changed'][0]['tags'])
+
+    def test_sync_should_not_return_other_users_changes(self):
+        token = self.sync()['token']
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123'
+        )
+        create_recipe(user=other)
+
+        body = self.sync(token)
+
+        self.assertEqual([], body['recipes']['changed'])
+        self.assertEqual(token, body['token'])
+
+    def test_sync_should_send_unsettled_changes_again(self):
+        token = self.sync()['token']
+        recipe = create_recipe(user=self.user)
+
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            body = self.sync(token)
+            again = self.sync(body['token'])
+
+        self.assertEqual(token, body['token'])
+        self.assertEqual(
+            [recipe.id], [r['id'] for r in again['recipes']['changed']]
+        )
+
+    def test_recipe_write_should_be_logged_in_one_insert(self):
+        token = self.sync()['token']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('recipe-list'), {
+                'title': 'Soup', 'time_minutes': 10, 'price': '2.50',
+                'tags': [{'name': 'Dinner'}, {'name': 'Quick'}],
+            }, format='json')
+
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "core_changelog"')
+        ]
+        self.assertEqual(1, len(inserts))
+        self.assertEqual(3, ChangeLog.objects.filter(id__gt=token).count())
+
+    def test_changes_rolled_back_to_a_savepoint_should_not_be_logged(self):
+        token = self.sync()['token']
+
+        with transaction.atomic():
+            kept = create_recipe(user=self.user, title='Kept')
+            try:
+                with transaction.atomic():
+                    create_recipe(user=self.user, title='Gone')
+                    raise DatabaseError()
+            except DatabaseError:
+                pass
+
+        body = self.sync(token)
+        self.assertEqual([kept.id], [r['id'] for r in body['recipes']['changed']])
+        self.assertEqual([], body['recipes']['deleted'])
+
+    @override_settings(SYNC_MAX_CHANGES=2)
+    def test_sync_should_page_through_changes(self):
+        token = self.sync()['token']
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        first = self.sync(token)
+        second = self.sync(first['token'])
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(
+            [r.id for r in recipes],
+            [r['id'] for page in (first, second)
+             for r in page['recipes']['changed']]
+        )
+
+    def test_sync_should_stay_within_query_budget(self):
+        token = self.sync()['token']
+        for i in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        # Change log, recipes with their tags and ingredients, tags,
+        # ingredients (skipped: nothing changed).
+        with self.assertQueryBudget(5):
+            self.sync(token)
+
+    def test_sync_with_invalid_token_should_return_400(self):
+        res = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
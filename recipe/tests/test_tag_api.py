@@ -1,15 +1,12 @@
-from django import setup
-
-setup()
-
-from django.test import TransactionTestCase
+from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from recipe.serializers import TagSerializer
+from decimal import Decimal
 
-from core.models import Tag
+from core.models import Tag, Recipe
 
 TAG_URL = reverse('tag-list')
 
@@ -37,7 +34,7 @@ def create_tag(user, **params):
     return Tag.objects.create(user=user, **defaults)
 
 
-class PublicTagApiTests(TransactionTestCase):
+class PublicTagApiTests(TestCase):
 
     def setUp(self) -> None:
         self.client = APIClient()
@@ -48,7 +45,7 @@ class PublicTagApiTests(TransactionTestCase):
         self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
 
 
-class PrivateTagApiTests(TransactionTestCase):
+class PrivateTagApiTests(TestCase):
 
     def setUp(self) -> None:
         payload = {
@@ -1,5 +1,16 @@
+from django.urls import path
 from rest_framework import routers
-from recipe.views import (RecipeViewSet, TagViewSet, IngredientViewSet)
+from recipe.views import (
+    RecipeViewSet,
+    TagViewSet,
+    IngredientViewSet,
+    SyncView
+)
+from recipe.async_views import (
+    AsyncRecipeView,
+    AsyncTagView,
+    AsyncIngredientView
+)
 
 router = routers.SimpleRouter()
 
@@ -7,3 +18,25 @@ router.register('recipes', RecipeViewSet)
 router.register('tags', TagViewSet)
 router.register('ingredients', IngredientViewSet)
 urlpatterns = router.urls
+
+urlpatterns += [
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('async/recipes/', AsyncRecipeView.as_view(), name='async-recipe-list'),
+    path(
+        'async/recipes/<int:pk>/',
+        AsyncRecipeView.as_view(),
+        name='async-recipe-detail'
+    ),
+    path('async/tags/', AsyncTagView.as_view(), name='async-tag-list'),
+    path('async/tags/<int:pk>/', AsyncTagView.as_view(), name='async-tag-detail'),
+    path(
+        'async/ingredients/',
+        AsyncIngredientView.as_view(),
+        name='async-ingredient-list'
+    ),
+    path(
+        'async/ingredients/<int:pk>/',
+        AsyncIngredientView.as_view(),
+        name='async-ingredient-detail'
+    ),
+]
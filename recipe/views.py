@@ -1,10 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import Count
+from django.http import HttpResponseRedirect
+from django.utils import timezone
 from rest_framework import (viewsets, mixins, status)
+from rest_framework.generics import get_object_or_404
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from core.models import Recipe, Tag, Ingredient
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from core import images
+from core.cache import (
+    CachedListMixin,
+    add_recipe_detail,
+    get_recipe_detail,
+    get_recipe_details,
+    set_recipe_detail,
+    user_cache_key,
+)
+from core.idempotency import idempotent
+from core.media import FileContentNegotiation, serve
+from core.metrics import InstrumentedViewMixin, timed
+from core.models import (
+    ChangeLog,
+    Recipe,
+    Tag,
+    Ingredient,
+    recipe_image_file_path
+)
+from core.routers import reading_from_replica
+from core.storage import IMAGE_CONTENT_TYPES
 from recipe import serializers
+from recipe.jobs import render_image_variants
+from recipe.renderers import NormalizedJSONRenderer
+from PIL import UnidentifiedImageError
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -12,8 +48,11 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+IMAGE_UPLOAD_SALT = 'recipe.views.image_upload'
 
-class BaseRecipeViewSet(viewsets.ModelViewSet):
+
+class BaseRecipeViewSet(InstrumentedViewMixin, CachedListMixin,
+                        viewsets.ModelViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -32,40 +71,168 @@ class BaseRecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR,
+                enum=['json', 'normalized'],
+                description='"normalized" returns recipes with tag and '
+                            'ingredient IDs plus top-level "tags" and '
+                            '"ingredients" maps.',
+            ),
         ]
     )
 )
 class RecipeViewSet(BaseRecipeViewSet):
     serializer_class = serializers.RecipeDetailSerializer
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.prefetch_related('tags', 'ingredients')
+    throttle_scope = 'recipes'
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        NormalizedJSONRenderer
+    ]
 
     def __params_to_ints(self, qs):
         return [int(str_id) for str_id in qs.split(',')]
 
-    def get_queryset(self):
+    def __filter(self, queryset):
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
 
-        queryset = self.queryset
         if tags:
             tag_ids = self.__params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
         if ingredients:
             ingredient_ids = self.__params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        return queryset.filter(user=self.request.user)
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+    def get_queryset(self):
+        return self.__filter(self.queryset).order_by('-id').distinct()
 
     def get_serializer_class(self):
         if self.action == 'list':
+            renderer = getattr(self.request, 'accepted_renderer', None)
+            if isinstance(renderer, NormalizedJSONRenderer):
+                return serializers.NormalizedRecipeSerializer
             return serializers.RecipeSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'confirm_image'):
             return serializers.RecipeImageSerializer
+        elif self.action == 'image_upload_url':
+            return serializers.RecipeImageUploadSerializer
         return self.serializer_class
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the recipe from the detail cache when it holds one of the
+        user's recipes, otherwise load and cache it.
+        """
+        try:
+            recipe_id = int(kwargs['pk'])
+        except ValueError:
+            raise NotFound()
+        base_url = request.build_absolute_uri('/')
+        data = get_recipe_detail(recipe_id, request.user.pk, base_url)
+        if data is not None:
+            return Response(data)
+
+        response = super().retrieve(request, *args, **kwargs)
+        add_recipe_detail(recipe_id, request.user.pk, base_url, response.data)
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('tags', OpenApiTypes.STR),
+            OpenApiParameter('ingredients', OpenApiTypes.STR),
+        ],
+        responses=serializers.RecipeFacetsSerializer,
+    )
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """
+        Count the recipes matching the `tags` and `ingredients` filters,
+        and how many of them carry each tag and ingredient.
+        """
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        key = user_cache_key(
+            'facets', request.user.pk,
+            request.query_params.get('tags', ''),
+            request.query_params.get('ingredients', ''),
+        )
+        data = cache.get(key) if timeout else None
+        if data is None:
+            recipe_ids = self.__filter(Recipe.objects.all()).values('id')
+            data = serializers.RecipeFacetsSerializer({
+                'count': Recipe.objects.filter(id__in=recipe_ids).count(),
+                'tags': self.__facet(Recipe.tags.through, 'tag', recipe_ids),
+                'ingredients': self.__facet(
+                    Recipe.ingredients.through, 'ingredient', recipe_ids
+                ),
+            }).data
+            if timeout and not reading_from_replica():
+                cache.set(key, data, timeout)
+        return Response(data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ids', OpenApiTypes.STR, required=True,
+                description='Comma separated list of recipe IDs, at most '
+                            'RECIPE_BATCH_MAX_IDS.',
+            ),
+        ],
+        responses=serializers.RecipeDetailSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False)
+    def batch(self, request):
+        """
+        Details of the recipes listed in `ids`, in that order. IDs that do
+        not name one of the user's recipes are left out.
+        """
+        try:
+            recipe_ids = list(dict.fromkeys(
+                self.__params_to_ints(request.query_params.get('ids', ''))
+            ))
+        except ValueError:
+            raise ValidationError({'ids': 'Expected comma separated IDs.'})
+        limit = settings.RECIPE_BATCH_MAX_IDS
+        if len(recipe_ids) > limit:
+            raise ValidationError({'ids': f'At most {limit} IDs are allowed.'})
+
+        base_url = request.build_absolute_uri('/')
+        details = get_recipe_details(recipe_ids, request.user.pk, base_url)
+        missing = [pk for pk in recipe_ids if pk not in details]
+        if missing:
+            recipes = list(
+                self.queryset.filter(user=request.user, id__in=missing)
+            )
+            for recipe, data in zip(
+                recipes, self.get_serializer(recipes, many=True).data
+            ):
+                add_recipe_detail(recipe.pk, request.user.pk, base_url, data)
+                details[recipe.pk] = data
+        return Response(
+            [details[pk] for pk in recipe_ids if pk in details]
+        )
+
+    def __facet(self, through, field, recipe_ids):
+        """One grouped query counting `recipe_ids` per tag or ingredient."""
+        return [
+            {'id': row[f'{field}_id'], 'name': row[f'{field}__name'],
+             'count': row['count']}
+            for row in through.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values(f'{field}_id', f'{field}__name')
+            .annotate(count=Count('recipe_id'))
+            .order_by('-count', f'{field}__name')
+        ]
+
+    @idempotent
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
@@ -73,10 +240,117 @@ class RecipeViewSet(BaseRecipeViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            render_image_variants.enqueue(
+                recipe_id=recipe.pk, name=recipe.image.name
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(responses={(200, 'image/*'): OpenApiTypes.BINARY})
+    @action(
+        methods=['GET'],
+        detail=True,
+        content_negotiation_class=FileContentNegotiation,
+    )
+    def image(self, request, pk=None):
+        """
+        The recipe image, for its owner only. Local files are handed to the
+        front-end server (see core.media); object stores redirect to a
+        presigned URL.
+        """
+        recipe = self.get_object()
+        if not recipe.image:
+            raise NotFound()
+        storage = recipe.image.storage
+        if isinstance(storage, FileSystemStorage):
+            return serve(
+                request, storage, recipe.image.name,
+                cache_control='private, max-age=3600',
+            )
+        return HttpResponseRedirect(storage.url(recipe.image.name))
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=True, url_path='image-upload-url')
+    def image_upload_url(self, request, pk=None):
+        """
+        Presign a direct upload of the recipe image to media storage.
+
+        The client sends the file to `upload.url` with `upload.method`,
+        adding `upload.fields` as form fields (POST) or `upload.headers`
+        (PUT), then passes `token` to confirm-image.
+        """
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        content_type = serializer.validated_data['content_type']
+        name = recipe_image_file_path(
+            recipe, f'image{IMAGE_CONTENT_TYPES[content_type]}'
+        )
+        return Response({
+            'upload': default_storage.presigned_upload(
+                name, content_type,
+                settings.MEDIA_UPLOAD_MAX_SIZE,
+                settings.MEDIA_UPLOAD_EXPIRE,
+            ),
+            'token': signing.dumps(
+                {'recipe': recipe.pk, 'name': name}, salt=IMAGE_UPLOAD_SALT
+            ),
+        })
+
+    @extend_schema(
+        request=None,
+        responses={201: serializers.RecipeDetailSerializer},
+    )
+    @action(methods=['POST'], detail=True)
+    def duplicate(self, request, pk=None):
+        """
+        Copy the recipe with its tags, ingredients and image, for making a
+        variation of it.
+        """
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        copy_id = Recipe.objects.duplicate(recipe_id, request.user.pk)
+        if copy_id is None:
+            raise NotFound()
+
+        data = self.get_serializer(self.queryset.get(pk=copy_id)).data
+        set_recipe_detail(
+            copy_id, request.user.pk, request.build_absolute_uri('/'), data
+        )
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=serializers.RecipeImageConfirmSerializer)
+    @action(methods=['POST'], detail=True, url_path='confirm-image')
+    def confirm_image(self, request, pk=None):
+        """Attach an image uploaded through image-upload-url to the recipe."""
+        recipe = self.get_object()
+        confirm = serializers.RecipeImageConfirmSerializer(data=request.data)
+        confirm.is_valid(raise_exception=True)
+        try:
+            upload = signing.loads(
+                confirm.validated_data['token'],
+                salt=IMAGE_UPLOAD_SALT,
+                max_age=settings.MEDIA_UPLOAD_EXPIRE,
+            )
+        except signing.BadSignature:
+            raise ValidationError({'token': 'Invalid or expired token.'})
+        if upload['recipe'] != recipe.pk:
+            raise ValidationError({'token': 'Token is for another recipe.'})
+        # Only the object's metadata is checked; the bytes stay in storage.
+        if not default_storage.exists(upload['name']):
+            raise ValidationError({'token': 'The image was not uploaded.'})
+
+        recipe.image = upload['name']
+        recipe.save(update_fields=['image'])
+        render_image_variants.enqueue(
+            recipe_id=recipe.pk, name=recipe.image.name
+        )
+        return Response(self.get_serializer(recipe).data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -128,3 +402,165 @@ class IngredientViewSet(BaseRecipeViewSet):
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
         return queryset.filter(user=self.request.user).order_by('-name').distinct()
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            'since',
+            OpenApiTypes.STR,
+            description='Token returned by the previous sync. Omit it for a '
+                        'full snapshot.',
+        ),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class SyncView(InstrumentedViewMixin, APIView):
+    """
+    Recipes, tags and ingredients changed or deleted since a sync token.
+
+    Without `since` the response is a full snapshot. With it, only the
+    change log entries after the token are read, so the cost follows the
+    number of changes rather than the size of the collection. Each
+    collection comes back as `{"changed": [...], "deleted": [ids]}`;
+    recipes reference tags and ingredients by ID, and clients drop deleted
+    tags and ingredients from their recipes. While `has_more` is true the
+    client calls again with the returned `token`.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'sync'
+    collections = [
+        ('recipes', Recipe, serializers.SyncRecipeSerializer),
+        ('tags', Tag, serializers.TagSerializer),
+        ('ingredients', Ingredient, serializers.IngredientSerializer),
+    ]
+
+    def get(self, request):
+        since = self.parse_token(request.query_params.get('since'))
+        log = ChangeLog.objects.filter(user=request.user).order_by('id')
+
+        # Entries younger than this may still have older ids committing
+        # (see ChangeLog), so the token stops short of them and they are
+        # sent again next time.
+        settled = timezone.now() - timedelta(
+            seconds=settings.SYNC_SETTLE_SECONDS
+        )
+        if since is None:
+            token = log.filter(created_at__lte=settled).values_list(
+                'id', flat=True
+            ).last() or 0
+            body = {'token': str(token), 'has_more': False}
+            for name, model, serializer_class in self.collections:
+                body[name] = {
+                    'changed': self.serialize(
+                        serializer_class, self.get_queryset(model)
+                    ),
+                    'deleted': [],
+                }
+            return Response(body)
+
+        limit = settings.SYNC_MAX_CHANGES
+        entries = list(
+            log.filter(id__gt=since).values_list(
+                'id', 'model', 'object_id', 'action', 'created_at'
+            )[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        if has_more:
+            # A full page moves on regardless, or paging could stall.
+            token = entries[-1][0]
+        else:
+            token = max(
+                (entry[0] for entry in entries if entry[4] <= settled),
+                default=since,
+            )
+
+        # Only the latest action per object matters.
+        latest = {}
+        for _, model_name, object_id, action_name, _ in entries:
+            latest[model_name, object_id] = action_name
+
+        body = {'token': str(token), 'has_more': has_more}
+        for name, model, serializer_class in self.collections:
+            model_name = model._meta.model_name
+            upserted = sorted(
+                object_id for (entry_model, object_id), action_name
+                in latest.items()
+                if entry_model == model_name and action_name == ChangeLog.UPSERT
+            )
+            deleted = {
+                object_id for (entry_model, object_id), action_name
+                in latest.items()
+                if entry_model == model_name and action_name == ChangeLog.DELETE
+            }
+            changed = list(
+                self.get_queryset(model).filter(pk__in=upserted)
+            ) if upserted else []
+            # Upserted objects that are gone were deleted after this page.
+            deleted.update(set(upserted) - {obj.pk for obj in changed})
+            body[name] = {
+                'changed': self.serialize(serializer_class, changed),
+                'deleted': sorted(deleted),
+            }
+        return Response(body)
+
+    def parse_token(self, value):
+        if value is None:
+            return None
+        try:
+            token = int(value)
+        except ValueError:
+            token = -1
+        if token < 0:
+            raise ValidationError({'since': 'Invalid sync token.'})
+        return token
+
+    def get_queryset(self, model):
+        queryset = model.objects.filter(user=self.request.user).order_by('id')
+        if model is Recipe:
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+        return queryset
+
+    def serialize(self, serializer_class, instances):
+        serializer = serializer_class(
+            instances, many=True, context={'request': self.request}
+        )
+        with timed('serialize'):
+            return serializer.data
+
+
+@extend_schema(responses={(200, 'image/*'): OpenApiTypes.BINARY})
+class RecipeImageVariantView(InstrumentedViewMixin, APIView):
+    """
+    The recipe image fitted within one of the IMAGE_VARIANT_SIZES, as WebP,
+    AVIF or JPEG. Variants are rendered on first request and then served
+    from the disk cache in core.images.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = FileContentNegotiation
+
+    def get(self, request, pk, width, height, fmt):
+        if (width, height) not in images.allowed_sizes() or (
+            fmt not in images.FORMATS
+        ):
+            raise NotFound()
+        recipe = get_object_or_404(Recipe, pk=pk, user=request.user)
+        if not recipe.image:
+            raise NotFound()
+
+        try:
+            name = images.get_variant(
+                recipe.image.storage, recipe.image.name, width, height, fmt
+            )
+        except (FileNotFoundError, UnidentifiedImageError):
+            raise NotFound()
+        return serve(
+            request,
+            FileSystemStorage(location=settings.MEDIA_ROOT),
+            name,
+            content_type=images.CONTENT_TYPES[fmt],
+            cache_control='private, max-age=300',
+        )
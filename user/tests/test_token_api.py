@@ -1,16 +1,13 @@
-from django import setup
-from django.test import TransactionTestCase
+from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-setup()
-
 CREATE_TOKEN_URL = reverse('token-list')
 
 
-class PublicTokenApiTests(TransactionTestCase):
+class PublicTokenApiTests(TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
 
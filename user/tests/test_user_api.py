@@ -1,18 +1,15 @@
-from django import setup
-from django.test import TransactionTestCase
+from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-setup()
-
 CREATE_USER_URL = reverse('user-list')
 ME_URL = reverse('user-me')
 UPDATE_ME_URL = reverse('user-update-me')
 
 
-class PublicUserApiTests(TransactionTestCase):
+class PublicUserApiTests(TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
 
@@ -72,7 +69,7 @@ class PublicUserApiTests(TransactionTestCase):
         self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
 
 
-class PrivateUserApiTests(TransactionTestCase):
+class PrivateUserApiTests(TestCase):
 
     def setUp(self) -> None:
         payload = {
@@ -4,16 +4,24 @@ from rest_framework.decorators import action
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from django.contrib.auth import get_user_model
+from core.idempotency import idempotent
+from core.metrics import InstrumentedViewMixin
 from user.serializers import (UserSerializer, TokenSerializer)
 from rest_framework import status
 
 
 # Create your views here.
-class UserViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+class UserViewSet(InstrumentedViewMixin, mixins.CreateModelMixin,
+                  viewsets.GenericViewSet):
     authentication_classes = [authentication.TokenAuthentication]
     serializer_class = UserSerializer
+    throttle_scope = 'account'
     queryset = get_user_model().objects.all()
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=False, methods=['GET'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         serializer = self.get_serializer(request.user, many=False)
@@ -32,4 +40,7 @@ class UserViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
 
 class TokenViewSet(ObtainAuthToken):
     serializer_class = TokenSerializer
+    # ObtainAuthToken turns throttling off; login is where it matters most.
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'token'
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES